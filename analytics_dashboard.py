@@ -281,18 +281,8 @@ class AnalyticsDashboard:
             exercise_data = analytics_data.get('correlation_analysis', {}).get('exercise_data', [])
             mood_data = analytics_data.get('correlation_analysis', {}).get('mood_data', [])
             
-            # Get decision support
-            reassessment_timing = self.decision_support.recommend_phq9_reassessment_timing(patient_id, phq9_data, exercise_data)
-            intensification_recommendations = self.decision_support.suggest_treatment_intensification(patient_id, phq9_data, exercise_data, mood_data)
-            medication_alerts = self.decision_support.alert_medication_evaluation(patient_id, phq9_data, exercise_data)
-            outcome_evidence = self.decision_support.generate_outcome_evidence(patient_id, phq9_data, exercise_data)
-            
-            return {
-                'reassessment_timing': reassessment_timing,
-                'intensification_recommendations': intensification_recommendations,
-                'medication_alerts': medication_alerts,
-                'outcome_evidence': outcome_evidence
-            }
+            # Get all decision support sections from a single pass over the data
+            return self.decision_support.generate_full_report(patient_id, phq9_data, exercise_data, mood_data)
             
         except Exception as e:
             logger.error(f"Error getting decision support: {str(e)}")
@@ -4,6 +4,7 @@ MindSpace ML App - PHQ-9 Focused Mental Health Assessment System
 """
 
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
 from werkzeug.security import generate_password_hash, check_password_hash
@@ -47,14 +48,62 @@ except Exception as e:
     print("📝 Claude features will be disabled...")
     claude_client = None
 
+# Optional: orjson for faster jsonify() responses
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Optional: Flask-Compress for gzip/brotli response compression
+try:
+    from flask_compress import Compress
+    COMPRESS_AVAILABLE = True
+except ImportError:
+    COMPRESS_AVAILABLE = False
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes responses with orjson
+    
+    NumPy scalars/arrays are serialized natively; anything orjson does not
+    know falls back to Flask's default handling (dates, decimals, UUIDs).
+    """
+    option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if ORJSON_AVAILABLE else 0
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option),
+            mimetype=self.mimetype
+        )
+
 app = Flask(__name__)
+if ORJSON_AVAILABLE:
+    app.json = OrjsonProvider(app)
 app.config['SECRET_KEY'] = 'your-secret-key-here'
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///mindspace_ml_new.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Dev/test: raise on unplanned relationship lazy loads in provider feedback queries
+app.config['STRICT_LOADING'] = os.getenv('STRICT_LOADING', '').lower() in ('1', 'true')
+
+# Compress JSON/CSV payloads over 1 KB (dashboards, RL training exports); streamed
+# exports are compressed chunk by chunk
+if COMPRESS_AVAILABLE:
+    app.config['COMPRESS_MIMETYPES'] = ['application/json', 'application/x-ndjson', 'text/csv']
+    app.config['COMPRESS_LEVEL'] = 5
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    app.config['COMPRESS_STREAMS'] = True
+    Compress(app)
 
 db = SQLAlchemy(app)
 login_manager = LoginManager()
@@ -134,6 +183,11 @@ class PHQ9Assessment(db.Model):
     
     # Relationships
     patient = db.relationship('Patient', backref='phq9_assessments')
+    
+    # Indexes
+    __table_args__ = (
+        db.Index('ix_phq9_assessment_patient_date', 'patient_id', 'assessment_date'),
+    )
 
 class RecommendationResult(db.Model):
     """AI-generated recommendations based on PHQ-9 scores"""
@@ -164,6 +218,11 @@ class CrisisAlert(db.Model):
     # Relationships
     patient = db.relationship('Patient', backref='crisis_alerts')
     assessment = db.relationship('PHQ9Assessment', backref='crisis_alerts')
+    
+    # Indexes
+    __table_args__ = (
+        db.Index('ix_crisis_alert_patient_created', 'patient_id', 'created_at'),
+    )
 
 # Interactive Mental Health Exercise Models
 class Exercise(db.Model):
@@ -188,6 +247,9 @@ class Exercise(db.Model):
         db.CheckConstraint('estimated_duration > 0', name='check_duration_positive'),
     )
 
+# ExerciseSession.completion_status domain; position is the status' compact uint8 code in analytics
+EXERCISE_COMPLETION_STATUSES = ('started', 'completed', 'abandoned')
+
 class ExerciseSession(db.Model):
     """Individual exercise completion sessions"""
     id = db.Column(db.Integer, primary_key=True)
@@ -212,7 +274,12 @@ class ExerciseSession(db.Model):
     __table_args__ = (
         db.CheckConstraint('engagement_score >= 1 AND engagement_score <= 10', name='check_engagement_score'),
         db.CheckConstraint('effectiveness_rating >= 1 AND effectiveness_rating <= 10', name='check_effectiveness_rating'),
-        db.CheckConstraint("completion_status IN ('started', 'completed', 'abandoned')", name='check_completion_status'),
+        db.CheckConstraint(f"completion_status IN {EXERCISE_COMPLETION_STATUSES}", name='check_completion_status'),
+        db.Index('ix_exercise_session_patient_start', 'patient_id', 'start_time'),
+        # Partial covering index for the rated completed sessions read by effectiveness analytics
+        db.Index('ix_exercise_session_patient_rated', 'patient_id', 'start_time', 'effectiveness_rating',
+                 sqlite_where=db.and_(completion_status == 'completed', effectiveness_rating.isnot(None)),
+                 postgresql_where=db.and_(completion_status == 'completed', effectiveness_rating.isnot(None))),
     )
 
 class MoodEntry(db.Model):
@@ -242,6 +309,7 @@ class MoodEntry(db.Model):
         db.CheckConstraint('energy_level >= 1 AND energy_level <= 10', name='check_energy_level'),
         db.CheckConstraint('sleep_quality >= 1 AND sleep_quality <= 10', name='check_sleep_quality'),
         db.CheckConstraint("social_context IN ('alone', 'with_friends', 'family', 'work', 'other')", name='check_social_context'),
+        db.Index('ix_mood_entry_patient_timestamp', 'patient_id', 'timestamp'),
     )
 
 class ThoughtRecord(db.Model):
@@ -300,6 +368,7 @@ class ThoughtRecord(db.Model):
         db.CheckConstraint('mood_improvement >= 1 AND mood_improvement <= 10', name='check_mood_improvement'),
         db.CheckConstraint("situation_category IN ('work', 'social', 'health', 'family', 'relationships', 'academic', 'financial', 'other')", name='check_situation_category'),
         db.CheckConstraint("difficulty_level IN ('beginner', 'intermediate', 'advanced')", name='check_difficulty_level'),
+        db.Index('ix_thought_record_patient_created', 'patient_id', 'created_at'),
     )
 
 class EvidenceItem(db.Model):
@@ -897,13 +966,19 @@ class ProviderExerciseFeedback(db.Model):
     action = db.Column(db.String(20), nullable=False)  # approve, reject, modify, add, remove
     feedback_category = db.Column(db.String(50))
     feedback_text = db.Column(db.Text)
-    modified_recommendations = db.Column(db.Text)  # JSON string
+    modified_recommendations = db.Column(db.JSON(none_as_null=True), nullable=True)  # Modified exercise plan, NULL if unmodified
     clinical_rationale = db.Column(db.Text)
     submitted_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
     patient = db.relationship('Patient', backref='provider_feedback')
     provider = db.relationship('User', backref='exercise_feedback')
+    
+    # Indexes
+    __table_args__ = (
+        db.Index('ix_provider_feedback_provider_submitted', 'provider_id', 'submitted_at'),
+        db.Index('ix_provider_feedback_patient_provider_submitted', 'patient_id', 'provider_id', 'submitted_at'),
+    )
 
 # PHQ-9 Analysis System
 class PHQ9AnalysisSystem:
@@ -2384,8 +2459,12 @@ def get_behavioral_insights():
 # Create database tables
 with app.app_context():
     db.create_all()
+    # create_all() skips existing tables, so add indexes declared since they were created
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=db.engine, checkfirst=True)
     print("✅ Database tables created")
-    
+
     # Import and register blueprints after models are created
     try:
         # Import the modules
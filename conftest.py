@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Shared pytest fixtures for the provider session preparation and feedback tests
+
+Every test runs inside one database transaction that is rolled back afterwards,
+so nothing is written to the app's SQLite database.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from flask import g
+
+from app_ml_complete import (
+    app as flask_app, db, User, Patient, PHQ9Assessment, Exercise, ExerciseSession,
+    MoodEntry, CrisisAlert, ProviderExerciseFeedback
+)
+import provider_feedback_routes
+import provider_session_preparation
+
+@pytest.fixture(scope='session')
+def app():
+    """The app with the session preparation and provider feedback blueprints registered"""
+    if 'session_preparation' not in flask_app.blueprints:
+        flask_app.register_blueprint(provider_session_preparation.session_preparation,
+                                     url_prefix='/session-preparation')
+    if 'provider_feedback' not in flask_app.blueprints:
+        flask_app.register_blueprint(provider_feedback_routes.provider_feedback_bp, url_prefix='/provider')
+    flask_app.config['TESTING'] = True
+    return flask_app
+
+@pytest.fixture
+def db_session(app, monkeypatch):
+    """Database session whose commits only flush; everything is rolled back after the test"""
+    with app.app_context():
+        db.create_all()
+        monkeypatch.setattr(db.session, 'commit', db.session.flush)
+        for cache in (provider_session_preparation.cache, provider_feedback_routes.cache):
+            if cache is not None:
+                cache.clear()
+        try:
+            yield db.session
+        finally:
+            db.session.rollback()
+            db.session.remove()
+
+@pytest.fixture
+def provider(db_session):
+    """A provider user"""
+    user = User(username=f'provider_{uuid.uuid4().hex}', email=f'{uuid.uuid4().hex}@example.com',
+                password_hash='x', role='provider')
+    db_session.add(user)
+    db_session.flush()
+    return user
+
+@pytest.fixture
+def login_as(app):
+    """Return a test client logged in as the given user"""
+    def factory(user: User):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.id)
+            session['_fresh'] = True
+        # Requests share the test's app context, so drop the user Flask-Login cached on g
+        g.pop('_login_user', None)
+        return client
+
+    return factory
+
+@pytest.fixture
+def client(login_as, provider):
+    """Test client logged in as the provider"""
+    return login_as(provider)
+
+@pytest.fixture
+def make_patient(db_session):
+    """Create a patient with a month of moods, exercise sessions, assessments and crisis alerts"""
+    exercises = []
+    for exercise_type in ('cbt', 'mindfulness', 'breathing'):
+        exercise = Exercise(exercise_id=f'{exercise_type}_{uuid.uuid4().hex}', name=exercise_type, type=exercise_type,
+                            difficulty_level=2, estimated_duration=5, clinical_focus_areas='depression',
+                            engagement_mechanics='guided', data_points_collected='mood',
+                            description='Test exercise', instructions='Test instructions')
+        db_session.add(exercise)
+        exercises.append(exercise)
+    db_session.flush()
+
+    def factory(index: int = 0) -> Patient:
+        now = datetime.now()
+        user = User(username=f'patient_{uuid.uuid4().hex}', email=f'{uuid.uuid4().hex}@example.com',
+                    password_hash='x', role='patient')
+        db_session.add(user)
+        db_session.flush()
+
+        patient = Patient(user_id=user.id, first_name='Test', last_name=f'Patient {index}', age=30,
+                          gender='female', current_phq9_severity='moderate')
+        db_session.add(patient)
+        db_session.flush()
+
+        for day in range(0, 28, 4):
+            db_session.add(PHQ9Assessment(
+                patient_id=patient.id, **{f'q{q}_score': 1 for q in range(1, 10)},
+                total_score=18 - day // 4 - index, severity_level='moderate',
+                q9_risk_flag=day == 0, assessment_date=now - timedelta(days=day)
+            ))
+        for hour in range(6, 24 * 30, 9):
+            db_session.add(MoodEntry(
+                mood_id=f'mood_{uuid.uuid4().hex}', patient_id=patient.id, timestamp=now - timedelta(hours=hour),
+                mood_emoji=':)', intensity_level=(hour + index) % 10 + 1, energy_level=hour % 7 + 1,
+                social_context=('alone', 'family', 'work')[hour % 3]
+            ))
+        for hour in range(5, 24 * 30, 13):
+            completed = hour % 3 != 0
+            db_session.add(ExerciseSession(
+                session_id=f'session_{uuid.uuid4().hex}', patient_id=patient.id,
+                exercise_id=exercises[hour % 3].id, start_time=now - timedelta(hours=hour),
+                completion_status='completed' if completed else 'abandoned', engagement_score=hour % 5 + 1,
+                effectiveness_rating=(hour + index) % 10 + 1 if completed else None
+            ))
+        for hour in (30, 200):
+            db_session.add(CrisisAlert(patient_id=patient.id, alert_type='q9_risk', alert_message='Test alert',
+                                       severity_level='urgent', created_at=now - timedelta(hours=hour)))
+        db_session.flush()
+        return patient
+
+    return factory
+
+@pytest.fixture
+def make_feedback(db_session):
+    """Add a feedback record from a provider"""
+    def factory(patient: Patient, provider: User, **fields) -> ProviderExerciseFeedback:
+        record = ProviderExerciseFeedback(
+            patient_id=patient.id, provider_id=provider.id,
+            exercise_type=fields.pop('exercise_type', 'mindfulness'), action=fields.pop('action', 'approve'),
+            feedback_category=fields.pop('feedback_category', 'effectiveness'),
+            clinical_rationale=fields.pop('clinical_rationale', 'Test rationale'),
+            submitted_at=fields.pop('submitted_at', datetime.now()), **fields
+        )
+        db_session.add(record)
+        db_session.flush()
+        return record
+
+    return factory
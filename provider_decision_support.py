@@ -8,536 +8,682 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import cached_property
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 import json
 import logging
 import numpy as np
-import pandas as pd
 from sqlalchemy import and_, func, desc
 from sqlalchemy.orm import joinedload
 
 from app_ml_complete import (
     db, Patient, PHQ9Assessment, Exercise, ExerciseSession, 
-    CrisisAlert, MoodEntry, MindfulnessSession
+    CrisisAlert, MoodEntry, MindfulnessSession, EXERCISE_COMPLETION_STATUSES
 )
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    logging.warning("Numba not available. Decision support kernels will run uncompiled.")
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when Numba is not installed"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# uint8 codes for ExerciseSession.completion_status, following the model's CHECK domain
+COMPLETION_STATUS_CODES = {status: code for code, status in enumerate(EXERCISE_COMPLETION_STATUSES)}
+COMPLETED = np.uint8(COMPLETION_STATUS_CODES['completed'])
+
+# Number of most recent sessions used for "recent" engagement metrics (about two weeks)
+RECENT_SESSION_WINDOW = 14
+
+# Alert severity / urgency ordering; compare ranks, never the strings themselves
+SEVERITY_LEVELS = ('none', 'low', 'medium', 'high')
+SEVERITY_RANK = {level: rank for rank, level in enumerate(SEVERITY_LEVELS)}
+
+# PHQ-9 severity bands, indexed by total score (0-27)
+PHQ9_SEVERITY_LEVELS = ('minimal', 'mild', 'moderate', 'moderately_severe', 'severe')
+PHQ9_SEVERITY_CODES = {level: code for code, level in enumerate(PHQ9_SEVERITY_LEVELS)}
+PHQ9_MAX_SCORE = 27
+_PHQ9_SEVERITY_CODE_BY_SCORE = (0,) * 5 + (1,) * 5 + (2,) * 5 + (3,) * 5 + (4,) * 8
+
+# Score improvement cut points for clinical significance (bisect_right bins)
+_CLINICAL_SIGNIFICANCE_CUTS = (-1, 1, 3, 5)
+_CLINICAL_SIGNIFICANCE_LABELS = ('worsening', 'no_change', 'minimal_improvement', 'moderate_improvement', 'clinically_significant')
+
+# Reassessment rule table, indexed by ProviderDecisionSupport._select_reassessment_rules
+REASSESSMENT_RULES = np.array([
+    ('improving', '1 week', 'Significant improvement detected with high exercise engagement'),
+    ('concerning', '1 week', 'Concerning trends detected - immediate reassessment recommended'),
+    ('stable', '2 weeks', 'Stable condition with moderate engagement - standard reassessment timing'),
+    ('extended', '3 weeks', 'Good progress with consistent engagement - extended reassessment timing')
+], dtype=[('label', 'U10'), ('timing', 'U10'), ('reason', 'U80')])
+
+def _date_order(dates: np.ndarray):
+    """Indexer that puts `dates` in ascending order
+    
+    The analytics loaders usually return records already ordered by date, so an
+    O(N) monotonicity check lets the common case skip the argsort entirely.
+    """
+    if np.all(dates[1:] >= dates[:-1]):
+        return slice(None)
+    return np.argsort(dates, kind='stable')
+
+@dataclass
+class ExerciseColumns:
+    """Columnar (SoA) view of exercise session records, sorted by date"""
+    completion_status: np.ndarray  # uint8 codes
+    ratings: np.ndarray  # float32 (2, N): engagement_score, effectiveness_rating; NaN where missing
+    date: np.ndarray  # datetime64[us]
+    
+    @classmethod
+    def from_records(cls, exercise_data: List[Dict]) -> 'ExerciseColumns':
+        """Build date-sorted columns from the exercise dicts returned by the analytics loaders"""
+        dates = np.array([ex['date'] for ex in exercise_data], dtype='datetime64[us]')
+        order = _date_order(dates)
+        # Missing ratings become NaN so they drop out of nan-aware reductions
+        ratings = np.array(
+            [[ex['engagement_score'] or np.nan for ex in exercise_data],
+             [ex['effectiveness_rating'] or np.nan for ex in exercise_data]],
+            dtype=np.float32
+        )
+        return cls(
+            completion_status=np.fromiter(
+                (COMPLETION_STATUS_CODES.get(ex['completion_status'], 0) for ex in exercise_data),
+                dtype=np.uint8, count=len(exercise_data)
+            )[order],
+            ratings=ratings[:, order],
+            date=dates[order]
+        )
+    
+    @property
+    def engagement_score(self) -> np.ndarray:
+        return self.ratings[0]
+    
+    @property
+    def effectiveness_rating(self) -> np.ndarray:
+        return self.ratings[1]
+    
+    def __len__(self) -> int:
+        return len(self.completion_status)
+    
+    def __getitem__(self, key: slice) -> 'ExerciseColumns':
+        return ExerciseColumns(
+            completion_status=self.completion_status[key],
+            ratings=self.ratings[:, key],
+            date=self.date[key]
+        )
+
+def _severity_code_for_score(total_score: float) -> int:
+    """Index into PHQ9_SEVERITY_LEVELS for a PHQ-9 total score"""
+    return _PHQ9_SEVERITY_CODE_BY_SCORE[min(max(int(total_score), 0), PHQ9_MAX_SCORE)]
+
+def _phq9_severity_code(assessment: Dict) -> int:
+    """Severity code for an assessment dict, preferring the severity_level stored at write time"""
+    code = PHQ9_SEVERITY_CODES.get(assessment.get('severity_level'))
+    if code is None:
+        code = _severity_code_for_score(assessment['total_score'])
+    return code
+
+@dataclass
+class PatientView:
+    """Date-sorted columnar view of one patient's PHQ-9, exercise and mood history
+    
+    Built once per patient and shared by all decision support methods so the
+    histories are sorted and unpacked a single time.
+    """
+    phq9_scores: np.ndarray  # int64
+    phq9_severity: np.ndarray  # uint8 index into PHQ9_SEVERITY_LEVELS
+    phq9_dates: np.ndarray  # datetime64[us]
+    exercise: ExerciseColumns
+    mood_scores: np.ndarray  # float64, in recorded order
+    
+    @classmethod
+    def from_records(cls, phq9_data: List[Dict], exercise_data: List[Dict], mood_data: Optional[List[Dict]] = None) -> 'PatientView':
+        """Build a view from the PHQ-9, exercise and mood dicts returned by the analytics loaders"""
+        phq9_dates = np.array([p['assessment_date'] for p in phq9_data], dtype='datetime64[us]')
+        order = _date_order(phq9_dates)
+        return cls(
+            phq9_scores=np.array([p['total_score'] for p in phq9_data], dtype=np.int64)[order],
+            phq9_severity=np.fromiter(
+                (_phq9_severity_code(p) for p in phq9_data), dtype=np.uint8, count=len(phq9_data)
+            )[order],
+            phq9_dates=phq9_dates[order],
+            exercise=ExerciseColumns.from_records(exercise_data),
+            mood_scores=np.array([entry['mood_score'] for entry in mood_data or []], dtype=np.float64)
+        )
+    
+    @cached_property
+    def completion_rate(self) -> float:
+        """Share of all exercise sessions that were completed"""
+        return self._completion_rate(self.exercise)
+    
+    @cached_property
+    def recent_completion_rate(self) -> float:
+        """Share of the last RECENT_SESSION_WINDOW exercise sessions that were completed"""
+        return self._completion_rate(self.exercise[-RECENT_SESSION_WINDOW:])
+    
+    @staticmethod
+    def _completion_rate(cols: ExerciseColumns) -> float:
+        # Plain float so report dicts stay JSON-native
+        return float(np.count_nonzero(cols.completion_status == COMPLETED) / len(cols)) if len(cols) else 0.0
+
+@njit(cache=True)
+def _slope(y: np.ndarray) -> float:
+    """Closed-form least-squares slope of y against its index, skipping NaN points"""
+    n = 0
+    sx = 0.0
+    sy = 0.0
+    sxx = 0.0
+    sxy = 0.0
+    for i in range(y.shape[0]):
+        if y[i] == y[i]:
+            n += 1
+            sx += i
+            sy += y[i]
+            sxx += i * i
+            sxy += i * y[i]
+    denom = n * sxx - sx * sx
+    if n < 2 or denom == 0.0:
+        return 0.0
+    return (n * sxy - sx * sy) / denom
+
 class ProviderDecisionSupport:
     """Comprehensive decision support system for healthcare providers"""
     
     def __init__(self):
-        self.reassessment_thresholds = {
-            'immediate': {'score_change': 5, 'completion_rate': 0.3},
-            'urgent': {'score_change': 3, 'completion_rate': 0.5},
-            'standard': {'score_change': 2, 'completion_rate': 0.7},
-            'extended': {'score_change': 1, 'completion_rate': 0.8}
-        }
+        self.reassessment_rules = REASSESSMENT_RULES
         
-    def recommend_phq9_reassessment_timing(self, patient_id: int, phq9_data: List[Dict], exercise_data: List[Dict]) -> Dict:
-        """Recommend optimal PHQ-9 reassessment timing based on exercise progress"""
+    def generate_full_report(self, patient_id: int, phq9_data: List[Dict], exercise_data: List[Dict], mood_data: List[Dict], view: Optional[PatientView] = None) -> Dict:
+        """Generate all four decision support sections from a single pass over the patient's data"""
         try:
-            if not phq9_data or not exercise_data:
-                return {'recommendation': 'Schedule reassessment in 2 weeks', 'reason': 'Insufficient data for analysis'}
-            
-            # Analyze recent trends
-            recent_phq9 = sorted(phq9_data, key=lambda x: x['assessment_date'])[-2:]
-            recent_exercises = sorted(exercise_data, key=lambda x: x['date'])[-14:]  # Last 2 weeks
-            
-            if len(recent_phq9) < 2 or len(recent_exercises) < 7:
-                return {'recommendation': 'Schedule reassessment in 2 weeks', 'reason': 'Insufficient recent data'}
+            if view is None:
+                view = PatientView.from_records(phq9_data, exercise_data, mood_data)
             
-            # Calculate exercise engagement trend
-            completion_rate = sum(1 for ex in recent_exercises if ex['completion_status'] == 'completed') / len(recent_exercises)
-            engagement_trend = self._calculate_engagement_trend(pd.DataFrame(recent_exercises))
-            
-            # Calculate PHQ-9 trend
-            phq9_trend = recent_phq9[-1]['total_score'] - recent_phq9[0]['total_score']
-            
-            # Determine reassessment timing
-            if phq9_trend < -2 and completion_rate > 0.8:  # Improving with high engagement
-                timing = '1 week'
-                reason = 'Significant improvement detected with high exercise engagement'
-            elif phq9_trend > 2 or completion_rate < 0.3:  # Declining or low engagement
-                timing = '1 week'
-                reason = 'Concerning trends detected - immediate reassessment recommended'
-            elif abs(phq9_trend) <= 2 and 0.3 <= completion_rate <= 0.8:  # Stable with moderate engagement
-                timing = '2 weeks'
-                reason = 'Stable condition with moderate engagement - standard reassessment timing'
-            else:
-                timing = '3 weeks'
-                reason = 'Good progress with consistent engagement - extended reassessment timing'
+            # Shared intermediates: engagement, mood and PHQ-9 summaries (completion
+            # rates are memoized on the view)
+            engagement_analysis, mood_trends, phq9_progression = self._analyze_treatment_patterns(view)
             
             return {
-                'recommended_timing': timing,
-                'reasoning': reason,
-                'confidence_level': self._calculate_timing_confidence(phq9_trend, completion_rate, engagement_trend),
-                'supporting_data': {
-                    'phq9_trend': phq9_trend,
-                    'completion_rate': round(completion_rate, 3),
-                    'engagement_trend': engagement_trend
-                }
+                'reassessment_timing': self._format_reassessment(view),
+                'intensification_recommendations': self._format_intensification(engagement_analysis, mood_trends, phq9_progression),
+                'medication_alerts': self._format_medication_alerts(patient_id, view),
+                'outcome_evidence': self._format_outcome_evidence(patient_id, view)
             }
             
+        except Exception as e:
+            logger.error(f"Error generating decision support report: {str(e)}")
+            return {'error': f'Decision support report generation failed: {str(e)}'}
+
+    def recommend_phq9_reassessment_timing(self, patient_id: int, phq9_data: List[Dict], exercise_data: List[Dict], view: Optional[PatientView] = None) -> Dict:
+        """Recommend optimal PHQ-9 reassessment timing based on exercise progress"""
+        try:
+            if view is None:
+                view = PatientView.from_records(phq9_data, exercise_data)
+            
+            return self._format_reassessment(view)
+            
         except Exception as e:
             logger.error(f"Error recommending reassessment timing: {str(e)}")
             return {'error': f'Reassessment timing recommendation failed: {str(e)}'}
 
-    def suggest_treatment_intensification(self, patient_id: int, phq9_data: List[Dict], exercise_data: List[Dict], mood_data: List[Dict]) -> Dict:
+    def suggest_treatment_intensification(self, patient_id: int, phq9_data: List[Dict], exercise_data: List[Dict], mood_data: List[Dict], view: Optional[PatientView] = None) -> Dict:
         """Suggest treatment intensification based on engagement patterns"""
         try:
-            # Analyze current engagement patterns
-            engagement_analysis = self._analyze_engagement_patterns(exercise_data)
-            
-            # Analyze mood trends
-            mood_trends = self._analyze_mood_trends_from_data(mood_data)
-            
-            # Analyze PHQ-9 progression
-            phq9_progression = self._analyze_phq9_progression(phq9_data)
-            
-            recommendations = []
-            urgency_level = 'low'
-            
-            # Check for concerning patterns
-            if engagement_analysis.get('completion_rate', 0) < 0.4:
-                recommendations.append({
-                    'type': 'increase_exercise_frequency',
-                    'urgency': 'high',
-                    'reason': 'Low exercise completion rate indicates need for more intensive intervention',
-                    'specific_action': 'Increase daily exercise frequency and add motivational support'
-                })
-                urgency_level = 'high'
+            if view is None:
+                view = PatientView.from_records(phq9_data, exercise_data, mood_data)
             
-            if mood_trends.get('trend') == 'declining':
-                recommendations.append({
-                    'type': 'add_crisis_monitoring',
-                    'urgency': 'medium',
-                    'reason': 'Declining mood trends detected',
-                    'specific_action': 'Add daily mood monitoring and crisis intervention exercises'
-                })
-                urgency_level = max(urgency_level, 'medium')
-            
-            if phq9_progression.get('recent_trend', 0) > 3:
-                recommendations.append({
-                    'type': 'provider_consultation',
-                    'urgency': 'high',
-                    'reason': 'Significant PHQ-9 score increase detected',
-                    'specific_action': 'Schedule immediate provider consultation for treatment adjustment'
-                })
-                urgency_level = 'high'
-            
-            # Check for positive patterns that might allow de-escalation
-            if (engagement_analysis.get('completion_rate', 0) > 0.8 and 
-                mood_trends.get('trend') == 'improving' and 
-                phq9_progression.get('recent_trend', 0) < -2):
-                recommendations.append({
-                    'type': 'maintain_current_level',
-                    'urgency': 'low',
-                    'reason': 'Excellent progress with high engagement and improving mood',
-                    'specific_action': 'Maintain current exercise regimen and monitor for continued improvement'
-                })
-            
-            return {
-                'recommendations': recommendations,
-                'urgency_level': urgency_level,
-                'supporting_evidence': {
-                    'engagement_analysis': engagement_analysis,
-                    'mood_trends': mood_trends,
-                    'phq9_progression': phq9_progression
-                }
-            }
+            return self._format_intensification(*self._analyze_treatment_patterns(view))
             
         except Exception as e:
             logger.error(f"Error suggesting treatment intensification: {str(e)}")
             return {'error': f'Treatment intensification recommendation failed: {str(e)}'}
 
-    def alert_medication_evaluation(self, patient_id: int, phq9_data: List[Dict], exercise_data: List[Dict]) -> Dict:
+    def alert_medication_evaluation(self, patient_id: int, phq9_data: List[Dict], exercise_data: List[Dict], view: Optional[PatientView] = None) -> Dict:
         """Alert for patients likely to need medication evaluation"""
         try:
-            alerts = []
-            
-            # Analyze recent PHQ-9 scores
-            recent_phq9 = sorted(phq9_data, key=lambda x: x['assessment_date'])[-3:]
-            
-            if len(recent_phq9) >= 2:
-                # Check for persistent high scores
-                high_scores = [p for p in recent_phq9 if p['total_score'] >= 15]
-                if len(high_scores) >= 2:
-                    alerts.append({
-                        'type': 'persistent_high_scores',
-                        'severity': 'high',
-                        'description': f'Patient has maintained high PHQ-9 scores ({len(high_scores)} assessments ≥15)',
-                        'recommendation': 'Consider medication evaluation for persistent moderate-severe depression'
-                    })
-                
-                # Check for worsening despite exercise engagement
-                if len(recent_phq9) >= 2:
-                    score_change = recent_phq9[-1]['total_score'] - recent_phq9[0]['total_score']
-                    if score_change > 3:  # Worsening by 3+ points
-                        recent_exercises = [ex for ex in exercise_data if ex['date'] >= recent_phq9[0]['assessment_date']]
-                        completion_rate = sum(1 for ex in recent_exercises if ex['completion_status'] == 'completed') / len(recent_exercises) if recent_exercises else 0
-                        
-                        if completion_rate > 0.6:  # Good exercise engagement
-                            alerts.append({
-                                'type': 'worsening_despite_engagement',
-                                'severity': 'medium',
-                                'description': f'PHQ-9 score increased by {score_change} points despite {completion_rate*100:.1f}% exercise completion',
-                                'recommendation': 'Consider medication evaluation as exercise therapy may be insufficient'
-                            })
-            
-            # Check for crisis indicators
-            crisis_alerts = CrisisAlert.query.filter_by(patient_id=patient_id).order_by(CrisisAlert.created_at.desc()).limit(5).all()
-            recent_crises = [alert for alert in crisis_alerts if (datetime.utcnow() - alert.created_at).days <= 30]
+            if view is None:
+                view = PatientView.from_records(phq9_data, exercise_data)
             
-            if len(recent_crises) >= 3:
-                alerts.append({
-                    'type': 'frequent_crises',
-                    'severity': 'high',
-                    'description': f'Patient has experienced {len(recent_crises)} crisis events in the past 30 days',
-                    'recommendation': 'Urgent medication evaluation recommended for crisis management'
-                })
-            
-            return {
-                'alerts': alerts,
-                'total_alerts': len(alerts),
-                'highest_severity': max([alert['severity'] for alert in alerts], default='none'),
-                'summary': self._summarize_medication_alerts(alerts)
-            }
+            return self._format_medication_alerts(patient_id, view)
             
         except Exception as e:
             logger.error(f"Error alerting medication evaluation: {str(e)}")
             return {'error': f'Medication evaluation alerting failed: {str(e)}'}
 
-    def generate_outcome_evidence(self, patient_id: int, phq9_data: List[Dict], exercise_data: List[Dict]) -> Dict:
+    def generate_outcome_evidence(self, patient_id: int, phq9_data: List[Dict], exercise_data: List[Dict], view: Optional[PatientView] = None) -> Dict:
         """Generate evidence for insurance/outcome reporting"""
         try:
-            if not phq9_data or not exercise_data:
-                return {'error': 'Insufficient data for outcome evidence generation'}
+            if view is None:
+                view = PatientView.from_records(phq9_data, exercise_data)
             
-            # Calculate key outcome metrics
-            initial_score = phq9_data[0]['total_score'] if phq9_data else None
-            final_score = phq9_data[-1]['total_score'] if phq9_data else None
-            total_sessions = len(exercise_data)
-            completion_rate = sum(1 for ex in exercise_data if ex['completion_status'] == 'completed') / len(exercise_data)
-            
-            # Calculate improvement metrics
-            improvement_metrics = {}
-            if initial_score is not None and final_score is not None:
-                score_improvement = initial_score - final_score
-                percent_improvement = (score_improvement / initial_score) * 100 if initial_score > 0 else 0
-                
-                improvement_metrics = {
-                    'absolute_improvement': score_improvement,
-                    'percent_improvement': round(percent_improvement, 1),
-                    'clinical_significance': self._assess_clinical_significance(score_improvement),
-                    'severity_change': self._assess_severity_change(initial_score, final_score)
-                }
-            
-            # Generate outcome report
-            outcome_report = {
-                'patient_identifier': patient_id,
-                'treatment_period': {
-                    'start_date': phq9_data[0]['assessment_date'] if phq9_data else None,
-                    'end_date': phq9_data[-1]['assessment_date'] if phq9_data else None,
-                    'duration_weeks': len(phq9_data) if phq9_data else 0
-                },
-                'intervention_summary': {
-                    'total_exercise_sessions': total_sessions,
-                    'completion_rate': round(completion_rate * 100, 1),
-                    'average_engagement': round(np.mean([ex['engagement_score'] for ex in exercise_data if ex['engagement_score']]), 2),
-                    'average_effectiveness': round(np.mean([ex['effectiveness_rating'] for ex in exercise_data if ex['effectiveness_rating']]), 2)
-                },
-                'outcome_metrics': improvement_metrics,
-                'evidence_strength': self._assess_evidence_strength(phq9_data, exercise_data),
-                'recommendations_for_continued_care': self._generate_continued_care_recommendations(improvement_metrics, completion_rate)
-            }
-            
-            return outcome_report
+            return self._format_outcome_evidence(patient_id, view)
             
         except Exception as e:
             logger.error(f"Error generating outcome evidence: {str(e)}")
             return {'error': f'Outcome evidence generation failed: {str(e)}'}
 
-    # Helper methods
-    def _calculate_engagement_trend(self, df: pd.DataFrame) -> float:
-        """Calculate engagement trend over time"""
-        try:
-            if len(df) < 2:
-                return 0
-            
-            df_sorted = df.sort_values('date')
-            engagement_trend = np.polyfit(range(len(df_sorted)), df_sorted['engagement_score'], 1)[0]
-            return round(engagement_trend, 3)
+    # Report section formatters, shared by the public methods and generate_full_report
+    def _format_reassessment(self, view: PatientView) -> Dict:
+        """Reassessment timing section"""
+        if not view.phq9_scores.size or not len(view.exercise):
+            return {'recommendation': 'Schedule reassessment in 2 weeks', 'reason': 'Insufficient data for analysis'}
+        
+        # Analyze recent trends
+        recent_phq9 = view.phq9_scores[-2:]
+        recent_exercises = view.exercise[-RECENT_SESSION_WINDOW:]  # Last 2 weeks
+        
+        if len(recent_phq9) < 2 or len(recent_exercises) < 7:
+            return {'recommendation': 'Schedule reassessment in 2 weeks', 'reason': 'Insufficient recent data'}
+        
+        # Calculate exercise engagement trend
+        completion_rate = view.recent_completion_rate
+        engagement_trend = self._calculate_engagement_trend(recent_exercises.engagement_score)
+        
+        # Calculate PHQ-9 trend
+        phq9_trend = int(recent_phq9[-1] - recent_phq9[0])
+        
+        # Determine reassessment timing
+        rule = self.reassessment_rules[self._select_reassessment_rules(np.array([phq9_trend]), np.array([completion_rate]))[0]]
+        timing = str(rule['timing'])
+        reason = str(rule['reason'])
+        
+        return {
+            'recommended_timing': timing,
+            'reasoning': reason,
+            'confidence_level': self._calculate_timing_confidence(phq9_trend, completion_rate, engagement_trend),
+            'supporting_data': {
+                'phq9_trend': phq9_trend,
+                'completion_rate': round(completion_rate, 3),
+                'engagement_trend': engagement_trend
+            }
+        }
+
+    def _format_intensification(self, engagement_analysis: Dict, mood_trends: Dict, phq9_progression: Dict) -> Dict:
+        """Treatment intensification section"""
+        recommendations = []
+        urgency_rank = SEVERITY_RANK['low']
+        
+        # Check for concerning patterns
+        if engagement_analysis.get('completion_rate', 0) < 0.4:
+            recommendations.append({
+                'type': 'increase_exercise_frequency',
+                'urgency': 'high',
+                'reason': 'Low exercise completion rate indicates need for more intensive intervention',
+                'specific_action': 'Increase daily exercise frequency and add motivational support'
+            })
+            urgency_rank = SEVERITY_RANK['high']
+        
+        if mood_trends.get('trend') == 'declining':
+            recommendations.append({
+                'type': 'add_crisis_monitoring',
+                'urgency': 'medium',
+                'reason': 'Declining mood trends detected',
+                'specific_action': 'Add daily mood monitoring and crisis intervention exercises'
+            })
+            urgency_rank = max(urgency_rank, SEVERITY_RANK['medium'])
+        
+        if phq9_progression.get('recent_trend', 0) > 3:
+            recommendations.append({
+                'type': 'provider_consultation',
+                'urgency': 'high',
+                'reason': 'Significant PHQ-9 score increase detected',
+                'specific_action': 'Schedule immediate provider consultation for treatment adjustment'
+            })
+            urgency_rank = SEVERITY_RANK['high']
+        
+        # Check for positive patterns that might allow de-escalation
+        if (engagement_analysis.get('completion_rate', 0) > 0.8 and 
+            mood_trends.get('trend') == 'improving' and 
+            phq9_progression.get('recent_trend', 0) < -2):
+            recommendations.append({
+                'type': 'maintain_current_level',
+                'urgency': 'low',
+                'reason': 'Excellent progress with high engagement and improving mood',
+                'specific_action': 'Maintain current exercise regimen and monitor for continued improvement'
+            })
+        
+        return {
+            'recommendations': recommendations,
+            'urgency_level': SEVERITY_LEVELS[urgency_rank],
+            'supporting_evidence': {
+                'engagement_analysis': engagement_analysis,
+                'mood_trends': mood_trends,
+                'phq9_progression': phq9_progression
+            }
+        }
+
+    def _format_medication_alerts(self, patient_id: int, view: PatientView) -> Dict:
+        """Medication evaluation alerts section
+        
+        PHQ-9 and exercise checks read the passed view, so they cover the same
+        window as the other sections; only the crisis count is queried.
+        """
+        alerts = []
+        
+        # Analyze the three most recent PHQ-9 scores (oldest first)
+        recent_scores = view.phq9_scores[-3:]
+        
+        if len(recent_scores) >= 2:
+            # Check for persistent high scores
+            high_scores = int(np.count_nonzero(recent_scores >= 15))
+            if high_scores >= 2:
+                alerts.append({
+                    'type': 'persistent_high_scores',
+                    'severity': 'high',
+                    'description': f'Patient has maintained high PHQ-9 scores ({high_scores} assessments ≥15)',
+                    'recommendation': 'Consider medication evaluation for persistent moderate-severe depression'
+                })
             
-        except Exception as e:
-            logger.error(f"Error calculating engagement trend: {str(e)}")
+            # Check for worsening despite exercise engagement
+            score_change = int(recent_scores[-1] - recent_scores[0])
+            if score_change > 3:  # Worsening by 3+ points
+                since_first = view.exercise.date >= view.phq9_dates[-len(recent_scores)]
+                total = np.count_nonzero(since_first)
+                completed = np.count_nonzero(since_first & (view.exercise.completion_status == COMPLETED))
+                completion_rate = float(completed / total) if total else 0
+                
+                if completion_rate > 0.6:  # Good exercise engagement
+                    alerts.append({
+                        'type': 'worsening_despite_engagement',
+                        'severity': 'medium',
+                        'description': f'PHQ-9 score increased by {score_change} points despite {completion_rate*100:.1f}% exercise completion',
+                        'recommendation': 'Consider medication evaluation as exercise therapy may be insufficient'
+                    })
+        
+        # Check for crisis indicators
+        recent_crises = db.session.query(func.count(CrisisAlert.id)).filter(
+            CrisisAlert.patient_id == patient_id,
+            CrisisAlert.created_at >= datetime.utcnow() - timedelta(days=30)
+        ).scalar()
+        
+        if recent_crises >= 3:
+            alerts.append({
+                'type': 'frequent_crises',
+                'severity': 'high',
+                'description': f'Patient has experienced {recent_crises} crisis events in the past 30 days',
+                'recommendation': 'Urgent medication evaluation recommended for crisis management'
+            })
+        
+        return {
+            'alerts': alerts,
+            'total_alerts': len(alerts),
+            'highest_severity': SEVERITY_LEVELS[max((SEVERITY_RANK[alert['severity']] for alert in alerts), default=0)],
+            'summary': self._summarize_medication_alerts(alerts)
+        }
+
+    def _format_outcome_evidence(self, patient_id: int, view: PatientView) -> Dict:
+        """Outcome evidence section"""
+        if not view.phq9_scores.size or not len(view.exercise):
+            return {'error': 'Insufficient data for outcome evidence generation'}
+        
+        exercise = view.exercise
+        completion_rate = view.completion_rate
+        
+        # Calculate key outcome metrics
+        initial_score = int(view.phq9_scores[0])
+        final_score = int(view.phq9_scores[-1])
+        total_sessions = len(exercise)
+        
+        # Calculate improvement metrics
+        score_improvement = initial_score - final_score
+        percent_improvement = (score_improvement / initial_score) * 100 if initial_score > 0 else 0
+        
+        improvement_metrics = {
+            'absolute_improvement': score_improvement,
+            'percent_improvement': round(percent_improvement, 1),
+            'clinical_significance': self._assess_clinical_significance(score_improvement),
+            'severity_change': self._assess_severity_change(int(view.phq9_severity[0]), int(view.phq9_severity[-1]))
+        }
+        
+        # Engagement and effectiveness means in one pass over the stacked ratings
+        average_engagement, average_effectiveness = np.nanmean(exercise.ratings, axis=1, dtype=np.float64)
+        
+        # Generate outcome report
+        outcome_report = {
+            'patient_identifier': patient_id,
+            'treatment_period': {
+                'start_date': view.phq9_dates[0].item(),
+                'end_date': view.phq9_dates[-1].item(),
+                'duration_weeks': len(view.phq9_scores)
+            },
+            'intervention_summary': {
+                'total_exercise_sessions': total_sessions,
+                'completion_rate': round(completion_rate * 100, 1),
+                'average_engagement': round(float(average_engagement), 2),
+                'average_effectiveness': round(float(average_effectiveness), 2)
+            },
+            'outcome_metrics': improvement_metrics,
+            'evidence_strength': self._assess_evidence_strength(view),
+            'recommendations_for_continued_care': self._generate_continued_care_recommendations(improvement_metrics, completion_rate)
+        }
+        
+        return outcome_report
+
+    # Helper methods
+    def _select_reassessment_rules(self, trends: np.ndarray, rates: np.ndarray) -> np.ndarray:
+        """Row of reassessment_rules matching each (trend, completion rate) pair"""
+        return np.select(
+            [
+                (trends < -2) & (rates > 0.8),  # Improving with high engagement
+                (trends > 2) | (rates < 0.3),  # Declining or low engagement
+                (np.abs(trends) <= 2) & (rates >= 0.3) & (rates <= 0.8)  # Stable with moderate engagement
+            ],
+            [0, 1, 2],
+            default=3  # Good progress with consistent engagement
+        )
+
+    def _calculate_engagement_trend(self, engagement: np.ndarray) -> float:
+        """Calculate engagement trend over date-ordered engagement scores"""
+        if len(engagement) < 2:
             return 0
+        
+        engagement_trend = _slope(engagement.astype(np.float64))
+        return round(float(engagement_trend), 3)
 
     def _calculate_timing_confidence(self, phq9_trend: float, completion_rate: float, engagement_trend: float) -> str:
         """Calculate confidence level for timing recommendation"""
-        try:
-            # Factors that increase confidence
-            confidence_factors = 0
-            
-            if abs(phq9_trend) > 3:
-                confidence_factors += 1
-            if completion_rate > 0.8 or completion_rate < 0.3:
-                confidence_factors += 1
-            if abs(engagement_trend) > 0.5:
-                confidence_factors += 1
-            
-            if confidence_factors >= 2:
-                return 'high'
-            elif confidence_factors >= 1:
-                return 'medium'
-            else:
-                return 'low'
-                
-        except Exception as e:
-            logger.error(f"Error calculating timing confidence: {str(e)}")
+        # Factors that increase confidence
+        confidence_factors = 0
+        
+        if abs(phq9_trend) > 3:
+            confidence_factors += 1
+        if completion_rate > 0.8 or completion_rate < 0.3:
+            confidence_factors += 1
+        if abs(engagement_trend) > 0.5:
+            confidence_factors += 1
+        
+        if confidence_factors >= 2:
+            return 'high'
+        elif confidence_factors >= 1:
+            return 'medium'
+        else:
             return 'low'
 
-    def _analyze_engagement_patterns(self, exercise_data: List[Dict]) -> Dict:
+    def _analyze_treatment_patterns(self, view: PatientView) -> Tuple[Dict, Dict, Dict]:
+        """Run the engagement, mood and PHQ-9 analyzers over a patient view"""
+        return (
+            self._analyze_engagement_patterns(view),
+            self._analyze_mood_trends_from_data(view.mood_scores),
+            self._analyze_phq9_progression(view.phq9_scores)
+        )
+
+    def _analyze_engagement_patterns(self, view: PatientView) -> Dict:
         """Analyze exercise engagement patterns"""
-        try:
-            if not exercise_data:
-                return {'completion_rate': 0, 'engagement_level': 'none'}
-            
-            completed = sum(1 for ex in exercise_data if ex['completion_status'] == 'completed')
-            completion_rate = completed / len(exercise_data)
-            
-            engagement_scores = [ex['engagement_score'] for ex in exercise_data if ex['engagement_score']]
-            avg_engagement = sum(engagement_scores) / len(engagement_scores) if engagement_scores else 0
-            
-            if completion_rate > 0.8 and avg_engagement > 7:
-                engagement_level = 'high'
-            elif completion_rate > 0.5 and avg_engagement > 5:
-                engagement_level = 'moderate'
-            else:
-                engagement_level = 'low'
-            
-            return {
-                'completion_rate': completion_rate,
-                'average_engagement': avg_engagement,
-                'engagement_level': engagement_level,
-                'total_sessions': len(exercise_data)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error analyzing engagement patterns: {str(e)}")
-            return {'completion_rate': 0, 'engagement_level': 'error'}
+        cols = view.exercise
+        if not len(cols):
+            return {'completion_rate': 0, 'engagement_level': 'none'}
+        
+        completion_rate = view.completion_rate
+        
+        engagement_scores = cols.engagement_score[~np.isnan(cols.engagement_score)]
+        avg_engagement = float(engagement_scores.mean(dtype=np.float64)) if engagement_scores.size else 0
+        
+        if completion_rate > 0.8 and avg_engagement > 7:
+            engagement_level = 'high'
+        elif completion_rate > 0.5 and avg_engagement > 5:
+            engagement_level = 'moderate'
+        else:
+            engagement_level = 'low'
+        
+        return {
+            'completion_rate': completion_rate,
+            'average_engagement': avg_engagement,
+            'engagement_level': engagement_level,
+            'total_sessions': len(cols)
+        }
 
-    def _analyze_mood_trends_from_data(self, mood_data: List[Dict]) -> Dict:
-        """Analyze mood trends from mood data"""
-        try:
-            if not mood_data:
-                return {'trend': 'insufficient_data'}
-            
-            mood_scores = [entry['mood_score'] for entry in mood_data]
-            
-            # Calculate trend
-            if len(mood_scores) >= 7:
-                recent_avg = sum(mood_scores[-7:]) / 7
-                previous_avg = sum(mood_scores[-14:-7]) / 7 if len(mood_scores) >= 14 else mood_scores[0]
-                
-                if recent_avg < previous_avg:
-                    trend = 'improving'
-                elif recent_avg > previous_avg:
-                    trend = 'declining'
-                else:
-                    trend = 'stable'
+    def _analyze_mood_trends_from_data(self, mood_scores: np.ndarray) -> Dict:
+        """Analyze mood trends from mood scores"""
+        if not mood_scores.size:
+            return {'trend': 'insufficient_data'}
+        
+        # Calculate trend by comparing 7-entry window totals (equivalent to their
+        # averages, but exact for integer scores) taken from one cumulative sum
+        if mood_scores.size >= 7:
+            cumulative = np.concatenate(([0.0], np.cumsum(mood_scores)))
+            recent_total = cumulative[-1] - cumulative[-8]
+            previous_total = cumulative[-8] - cumulative[-15] if mood_scores.size >= 14 else 7 * mood_scores[0]
+            
+            if recent_total < previous_total:
+                trend = 'improving'
+            elif recent_total > previous_total:
+                trend = 'declining'
             else:
-                trend = 'insufficient_data'
-            
-            return {
-                'trend': trend,
-                'total_entries': len(mood_scores)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error analyzing mood trends: {str(e)}")
-            return {'trend': 'error'}
+                trend = 'stable'
+        else:
+            trend = 'insufficient_data'
+        
+        return {
+            'trend': trend,
+            'total_entries': int(mood_scores.size)
+        }
 
-    def _analyze_phq9_progression(self, phq9_data: List[Dict]) -> Dict:
+    def _analyze_phq9_progression(self, phq9_scores: np.ndarray) -> Dict:
         """Analyze PHQ-9 score progression"""
-        try:
-            if len(phq9_data) < 2:
-                return {'recent_trend': 0, 'overall_trend': 0}
-            
-            # Recent trend (last 2 assessments)
-            recent_trend = phq9_data[-1]['total_score'] - phq9_data[-2]['total_score']
-            
-            # Overall trend (first to last)
-            overall_trend = phq9_data[-1]['total_score'] - phq9_data[0]['total_score']
-            
-            return {
-                'recent_trend': recent_trend,
-                'overall_trend': overall_trend,
-                'total_assessments': len(phq9_data)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error analyzing PHQ-9 progression: {str(e)}")
+        if phq9_scores.size < 2:
             return {'recent_trend': 0, 'overall_trend': 0}
+        
+        # Recent trend (last 2 assessments) and overall trend (first to last)
+        recent_trend = int(phq9_scores[-1] - phq9_scores[-2])
+        overall_trend = int(phq9_scores[-1] - phq9_scores[0])
+        
+        return {
+            'recent_trend': recent_trend,
+            'overall_trend': overall_trend,
+            'total_assessments': int(phq9_scores.size)
+        }
 
     def _summarize_medication_alerts(self, alerts: List[Dict]) -> Dict:
         """Summarize medication alerts"""
-        try:
-            if not alerts:
-                return {'summary': 'No medication evaluation alerts'}
-            
-            severity_counts = {'high': 0, 'medium': 0, 'low': 0}
-            type_counts = {}
-            
-            for alert in alerts:
-                severity = alert.get('severity', 'low')
-                alert_type = alert.get('type', 'unknown')
-                
-                severity_counts[severity] += 1
-                type_counts[alert_type] = type_counts.get(alert_type, 0) + 1
-            
-            return {
-                'total_alerts': len(alerts),
-                'severity_distribution': severity_counts,
-                'type_distribution': type_counts,
-                'highest_priority': 'high' if severity_counts['high'] > 0 else 'medium' if severity_counts['medium'] > 0 else 'low'
-            }
+        if not alerts:
+            return {'summary': 'No medication evaluation alerts'}
+        
+        severity_counts = {'high': 0, 'medium': 0, 'low': 0}
+        type_counts = {}
+        
+        for alert in alerts:
+            severity = alert.get('severity', 'low')
+            alert_type = alert.get('type', 'unknown')
             
-        except Exception as e:
-            logger.error(f"Error summarizing medication alerts: {str(e)}")
-            return {'error': f'Alert summarization failed: {str(e)}'}
+            severity_counts[severity] += 1
+            type_counts[alert_type] = type_counts.get(alert_type, 0) + 1
+        
+        return {
+            'total_alerts': len(alerts),
+            'severity_distribution': severity_counts,
+            'type_distribution': type_counts,
+            'highest_priority': 'high' if severity_counts['high'] > 0 else 'medium' if severity_counts['medium'] > 0 else 'low'
+        }
 
     def _assess_clinical_significance(self, score_improvement: float) -> str:
         """Assess clinical significance of PHQ-9 improvement"""
-        try:
-            if score_improvement >= 5:
-                return 'clinically_significant'
-            elif score_improvement >= 3:
-                return 'moderate_improvement'
-            elif score_improvement >= 1:
-                return 'minimal_improvement'
-            elif score_improvement >= -1:
-                return 'no_change'
-            else:
-                return 'worsening'
-                
-        except Exception as e:
-            logger.error(f"Error assessing clinical significance: {str(e)}")
-            return 'unknown'
+        return _CLINICAL_SIGNIFICANCE_LABELS[bisect_right(_CLINICAL_SIGNIFICANCE_CUTS, score_improvement)]
 
-    def _assess_severity_change(self, initial_score: float, final_score: float) -> str:
-        """Assess change in depression severity"""
-        try:
-            initial_severity = self._get_severity_level(initial_score)
-            final_severity = self._get_severity_level(final_score)
-            
-            severity_levels = ['minimal', 'mild', 'moderate', 'moderately_severe', 'severe']
-            
-            initial_index = severity_levels.index(initial_severity)
-            final_index = severity_levels.index(final_severity)
-            
-            change = final_index - initial_index
-            
-            if change < 0:
-                return 'improved_severity'
-            elif change > 0:
-                return 'worsened_severity'
-            else:
-                return 'no_severity_change'
-                
-        except Exception as e:
-            logger.error(f"Error assessing severity change: {str(e)}")
-            return 'unknown'
+    def _assess_severity_change(self, initial_severity: int, final_severity: int) -> str:
+        """Assess change in depression severity between two PHQ9_SEVERITY_LEVELS codes"""
+        change = final_severity - initial_severity
+        
+        if change < 0:
+            return 'improved_severity'
+        elif change > 0:
+            return 'worsened_severity'
+        else:
+            return 'no_severity_change'
 
     def _get_severity_level(self, total_score: float) -> str:
         """Determine severity level from PHQ-9 total score"""
-        if total_score <= 4:
-            return 'minimal'
-        elif total_score <= 9:
-            return 'mild'
-        elif total_score <= 14:
-            return 'moderate'
-        elif total_score <= 19:
-            return 'moderately_severe'
-        else:
-            return 'severe'
+        return PHQ9_SEVERITY_LEVELS[_severity_code_for_score(total_score)]
 
-    def _assess_evidence_strength(self, phq9_data: List[Dict], exercise_data: List[Dict]) -> str:
+    def _assess_evidence_strength(self, view: PatientView) -> str:
         """Assess strength of evidence for outcome reporting"""
-        try:
-            # Factors that increase evidence strength
-            evidence_factors = 0
-            
-            # Multiple PHQ-9 assessments
-            if len(phq9_data) >= 3:
-                evidence_factors += 1
-            
-            # Consistent exercise engagement
-            if len(exercise_data) >= 10:
-                evidence_factors += 1
-            
-            # High completion rate
-            completion_rate = sum(1 for ex in exercise_data if ex['completion_status'] == 'completed') / len(exercise_data)
-            if completion_rate >= 0.7:
+        # Factors that increase evidence strength
+        evidence_factors = 0
+        
+        # Multiple PHQ-9 assessments
+        if len(view.phq9_scores) >= 3:
+            evidence_factors += 1
+        
+        # Consistent exercise engagement
+        if len(view.exercise) >= 10:
+            evidence_factors += 1
+        
+        # High completion rate
+        if view.completion_rate >= 0.7:
+            evidence_factors += 1
+        
+        # Regular assessment intervals
+        if len(view.phq9_scores) >= 2:
+            # Whole days between consecutive assessments (floor, like timedelta.days)
+            avg_interval = (np.diff(view.phq9_dates) // np.timedelta64(1, 'D')).mean()
+            if 7 <= avg_interval <= 28:  # Weekly to monthly intervals
                 evidence_factors += 1
-            
-            # Regular assessment intervals
-            if len(phq9_data) >= 2:
-                intervals = []
-                for i in range(1, len(phq9_data)):
-                    interval = (phq9_data[i]['assessment_date'] - phq9_data[i-1]['assessment_date']).days
-                    intervals.append(interval)
-                
-                avg_interval = np.mean(intervals)
-                if 7 <= avg_interval <= 28:  # Weekly to monthly intervals
-                    evidence_factors += 1
-            
-            if evidence_factors >= 3:
-                return 'strong'
-            elif evidence_factors >= 2:
-                return 'moderate'
-            else:
-                return 'weak'
-                
-        except Exception as e:
-            logger.error(f"Error assessing evidence strength: {str(e)}")
-            return 'unknown'
+        
+        if evidence_factors >= 3:
+            return 'strong'
+        elif evidence_factors >= 2:
+            return 'moderate'
+        else:
+            return 'weak'
 
     def _generate_continued_care_recommendations(self, improvement_metrics: Dict, completion_rate: float) -> List[str]:
         """Generate recommendations for continued care"""
-        try:
-            recommendations = []
-            
-            if not improvement_metrics:
-                recommendations.append("Continue current treatment plan with regular monitoring")
-                return recommendations
-            
-            clinical_significance = improvement_metrics.get('clinical_significance', 'unknown')
-            percent_improvement = improvement_metrics.get('percent_improvement', 0)
-            
-            if clinical_significance == 'clinically_significant':
-                recommendations.append("Consider tapering exercise frequency while maintaining monitoring")
-                recommendations.append("Schedule follow-up PHQ-9 assessment in 4-6 weeks")
-            elif clinical_significance == 'moderate_improvement':
-                recommendations.append("Continue current exercise regimen with monthly reassessment")
-                recommendations.append("Consider adding complementary interventions")
-            elif clinical_significance == 'minimal_improvement':
-                recommendations.append("Review and potentially intensify exercise program")
-                recommendations.append("Consider additional therapeutic modalities")
-            else:
-                recommendations.append("Re-evaluate treatment approach and consider alternatives")
-                recommendations.append("Schedule provider consultation for treatment adjustment")
-            
-            if completion_rate < 0.6:
-                recommendations.append("Focus on improving exercise adherence and engagement")
-            
+        recommendations = []
+        
+        if not improvement_metrics:
+            recommendations.append("Continue current treatment plan with regular monitoring")
             return recommendations
-            
-        except Exception as e:
-            logger.error(f"Error generating continued care recommendations: {str(e)}")
-            return ["Continue current treatment plan with regular monitoring"]
+        
+        clinical_significance = improvement_metrics.get('clinical_significance', 'unknown')
+        percent_improvement = improvement_metrics.get('percent_improvement', 0)
+        
+        if clinical_significance == 'clinically_significant':
+            recommendations.append("Consider tapering exercise frequency while maintaining monitoring")
+            recommendations.append("Schedule follow-up PHQ-9 assessment in 4-6 weeks")
+        elif clinical_significance == 'moderate_improvement':
+            recommendations.append("Continue current exercise regimen with monthly reassessment")
+            recommendations.append("Consider adding complementary interventions")
+        elif clinical_significance == 'minimal_improvement':
+            recommendations.append("Review and potentially intensify exercise program")
+            recommendations.append("Consider additional therapeutic modalities")
+        else:
+            recommendations.append("Re-evaluate treatment approach and consider alternatives")
+            recommendations.append("Schedule provider consultation for treatment adjustment")
+        
+        if completion_rate < 0.6:
+            recommendations.append("Focus on improving exercise adherence and engagement")
+        
+        return recommendations
 
 # Initialize the provider decision support system
 provider_decision_support = ProviderDecisionSupport()
@@ -9,18 +9,110 @@ import sys
 import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple, Any
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Any, Union
 import json
 import logging
-from sqlalchemy import and_, func, desc
-from sqlalchemy.orm import joinedload
+import time
+import numpy as np
+from sqlalchemy import String, and_, func, desc, insert, literal, select, union_all
+from sqlalchemy.orm import joinedload, raiseload
+from flask import current_app
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Models will be imported dynamically to avoid circular imports
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# JSON encoding for stored recommendation blobs (_dumps, str for Text
+# columns) and streamed exports (_dumpb, bytes)
+if ORJSON_AVAILABLE:
+    def _dumpb(obj: Any) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    
+    def _dumps(obj: Any) -> str:
+        return _dumpb(obj).decode()
+else:
+    def _json_default(obj: Any) -> str:
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+    
+    def _dumps(obj: Any) -> str:
+        return json.dumps(obj, default=_json_default)
+    
+    def _dumpb(obj: Any) -> bytes:
+        return _dumps(obj).encode()
+
+def _utcnow() -> datetime:
+    """Naive UTC now, matching the models' datetime.utcnow column defaults"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _dumps_optional(obj: Any) -> Optional[str]:
+    """Encode obj for a nullable JSON Text column; empty/missing values stay NULL"""
+    return _dumps(obj) if obj else None
+
+# Provider feedback actions and categories
+FEEDBACK_TYPES = {
+    'approve': 'approved',
+    'reject': 'rejected',
+    'modify': 'modified',
+    'add': 'added',
+    'remove': 'removed'
+}
+VALID_FEEDBACK_ACTIONS = frozenset(FEEDBACK_TYPES)
+REQUIRED_FEEDBACK_FIELDS = ('action', 'exercise_type')
+
+FEEDBACK_CATEGORIES = {
+    'clinical_appropriateness': 'Clinical appropriateness for patient condition',
+    'safety_concerns': 'Safety concerns or contraindications',
+    'patient_preference': 'Patient preference or history',
+    'timing_issues': 'Timing or scheduling concerns',
+    'effectiveness': 'Expected effectiveness based on evidence',
+    'other': 'Other clinical considerations'
+}
+
+# RL reward per provider action, and weights for categories that matter more
+REWARD_BY_ACTION = {
+    'approve': 1.0,
+    'modify': 0.5,
+    'add': 0.8,
+    'reject': -0.5,
+    'remove': -0.3
+}
+REWARD_CATEGORY_WEIGHTS = {
+    'safety_concerns': 1.5,  # Higher weight for safety
+    'effectiveness': 1.2  # Higher weight for effectiveness
+}
+
+# Feedback rows fetched (and their patient history prefetched) per RL export chunk
+RL_EXPORT_CHUNK_SIZE = 200
+
+# Mood entries / exercise sessions an RL sample reads on each side of its feedback
+# (context before, outcome after); also bounds the history prefetched per chunk
+RL_MOOD_WINDOW = 7
+RL_SESSION_WINDOW = 10
+
+# Seconds the exercise catalog (available exercises / per-type context) is reused
+EXERCISE_CACHE_TTL = 300
+
+# Feedback trends look back over this many days
+FEEDBACK_TREND_DAYS = 30
+FEEDBACK_TREND_WINDOW = timedelta(days=FEEDBACK_TREND_DAYS)
+
+# Dashboard slices that only need the provider id run concurrently on this many threads
+DASHBOARD_WORKERS = 2
+
 class ProviderExerciseFeedbackService:
     """Provider feedback system for exercise recommendations"""
     
@@ -28,26 +120,40 @@ class ProviderExerciseFeedbackService:
         # Models will be imported dynamically
         self._models = None
         
-        # Initialize feedback types
-        self.feedback_types = {
-            'approve': 'approved',
-            'reject': 'rejected', 
-            'modify': 'modified',
-            'add': 'added',
-            'remove': 'removed'
-        }
+        # Exercise catalog cache; the catalog changes rarely
+        self._available_exercises = None
+        self._exercise_contexts = {}
+        self._exercise_cache_ts = 0.0
         
-        self.feedback_categories = {
-            'clinical_appropriateness': 'Clinical appropriateness for patient condition',
-            'safety_concerns': 'Safety concerns or contraindications',
-            'patient_preference': 'Patient preference or history',
-            'timing_issues': 'Timing or scheduling concerns',
-            'effectiveness': 'Expected effectiveness based on evidence',
-            'other': 'Other clinical considerations'
-        }
+        # Feedback types/categories are shared module constants
+        self.feedback_types = FEEDBACK_TYPES
+        self.feedback_categories = FEEDBACK_CATEGORIES
     
+    def _loader_options(self, *options) -> Tuple:
+        """Query loader options, plus raiseload('*') when STRICT_LOADING is enabled
+        
+        In dev/test this turns any relationship access that wasn't eager-loaded
+        into an error instead of a silent per-row lazy load.
+        """
+        if current_app.config.get('STRICT_LOADING'):
+            return options + (raiseload('*'),)
+        return options
+
+    def _in_app_context(self, app, fn, *args):
+        """Run fn in its own app context (and so its own scoped session) on a worker thread"""
+        with app.app_context():
+            try:
+                return fn(*args)
+            finally:
+                db.session.remove()
+
     def _get_models(self):
-        """Get database models dynamically to avoid circular imports"""
+        """Get database models dynamically to avoid circular imports
+        
+        On first use the models are also bound as module globals, which is how
+        the method bodies below refer to them (Patient.query, db.session, ...).
+        Public entry points call this before touching the database.
+        """
         if self._models is None:
             import app_ml_complete
             self._models = {
@@ -62,14 +168,13 @@ class ProviderExerciseFeedbackService:
                 'User': app_ml_complete.User,
                 'ProviderExerciseFeedback': app_ml_complete.ProviderExerciseFeedback
             }
+            globals().update(self._models)
         return self._models
 
     def get_patient_exercise_recommendations(self, patient_id: int, provider_id: int) -> Dict:
         """Get current exercise recommendations for a patient that need provider review"""
         try:
-            models = self._get_models()
-            Patient = models['Patient']
-            PHQ9Assessment = models['PHQ9Assessment']
+            self._get_models()
             
             # Get patient and latest assessment
             patient = Patient.query.get(patient_id)
@@ -125,38 +230,13 @@ class ProviderExerciseFeedbackService:
                                feedback_data: Dict) -> Dict:
         """Submit provider feedback on exercise recommendations"""
         try:
+            self._get_models()
+            
             # Validate feedback data
             if not self._validate_feedback_data(feedback_data):
                 return {'error': 'Invalid feedback data'}
             
-            # Create feedback record
-            feedback_record = ProviderExerciseFeedback(
-                patient_id=patient_id,
-                provider_id=provider_id,
-                recommendation_id=feedback_data.get('recommendation_id'),
-                exercise_type=feedback_data.get('exercise_type'),
-                action=feedback_data.get('action'),  # approve, reject, modify, add, remove
-                feedback_category=feedback_data.get('category'),
-                feedback_text=feedback_data.get('feedback_text', ''),
-                modified_recommendations=json.dumps(feedback_data.get('modified_recommendations', {})),
-                clinical_rationale=feedback_data.get('clinical_rationale', ''),
-                submitted_at=datetime.now()
-            )
-            
-            db.session.add(feedback_record)
-            
-            # If approved, create the actual exercise session/recommendation
-            if feedback_data.get('action') == 'approve':
-                self._create_approved_exercise_session(patient_id, feedback_data)
-            
-            # If modified, create modified recommendation
-            elif feedback_data.get('action') == 'modify':
-                self._create_modified_recommendation(patient_id, feedback_data)
-            
-            # If new exercise added, create new recommendation
-            elif feedback_data.get('action') == 'add':
-                self._create_new_exercise_recommendation(patient_id, feedback_data)
-            
+            feedback_record = self._add_feedback(patient_id, provider_id, feedback_data, _utcnow())
             db.session.commit()
             
             # Update RL training data
@@ -174,36 +254,124 @@ class ProviderExerciseFeedbackService:
             db.session.rollback()
             return {'error': f'Failed to submit feedback: {str(e)}'}
 
+    def submit_provider_feedback_bulk(self, patient_id: int, provider_id: int,
+                                      feedback_data_list: List[Dict]) -> Dict:
+        """Submit many feedback items for a patient with a single commit
+        
+        Valid items are written with one INSERT ... RETURNING inside a SAVEPOINT.
+        If that fails, each item is retried in its own SAVEPOINT so a failing item
+        is rolled back on its own. 'results' has one entry per input item.
+        """
+        try:
+            self._get_models()
+            
+            results = [{'error': 'Invalid feedback data'} for _ in feedback_data_list]
+            valid = [i for i, feedback_data in enumerate(feedback_data_list)
+                     if self._validate_feedback_data(feedback_data)]
+            if not valid:
+                if feedback_data_list:
+                    return {'error': 'Invalid feedback data',
+                            'invalid_indices': list(range(len(feedback_data_list)))}
+                return {'success': True, 'feedback_ids': [], 'submitted_count': 0, 'results': [],
+                        'message': 'No feedback to submit'}
+            
+            now = _utcnow()
+            try:
+                with db.session.begin_nested():
+                    feedback_ids = db.session.execute(
+                        insert(ProviderExerciseFeedback).returning(
+                            ProviderExerciseFeedback.id, sort_by_parameter_order=True
+                        ),
+                        [{
+                            'patient_id': patient_id,
+                            'provider_id': provider_id,
+                            'recommendation_id': feedback_data_list[i].get('recommendation_id'),
+                            'exercise_type': feedback_data_list[i].get('exercise_type'),
+                            'action': feedback_data_list[i].get('action'),
+                            'feedback_category': feedback_data_list[i].get('category'),
+                            'feedback_text': feedback_data_list[i].get('feedback_text', ''),
+                            'modified_recommendations': feedback_data_list[i].get('modified_recommendations') or None,
+                            'clinical_rationale': feedback_data_list[i].get('clinical_rationale', ''),
+                            'submitted_at': now
+                        } for i in valid]
+                    ).scalars().all()
+                    
+                    # Action side effects are added to the same transaction
+                    for i in valid:
+                        self._apply_feedback_action(patient_id, feedback_data_list[i], now)
+                
+                for i, feedback_id in zip(valid, feedback_ids):
+                    results[i] = {'success': True, 'feedback_id': feedback_id}
+                
+            except Exception as e:
+                logger.warning(f"Bulk feedback insert failed, retrying items individually: {str(e)}")
+                
+                for i in valid:
+                    try:
+                        with db.session.begin_nested():
+                            feedback_record = self._add_feedback(patient_id, provider_id, feedback_data_list[i], now)
+                    except Exception as e:
+                        logger.error(f"Error submitting provider feedback: {str(e)}")
+                        results[i] = {'error': f'Failed to submit feedback: {str(e)}'}
+                        continue
+                    
+                    results[i] = {'success': True, 'feedback_id': feedback_record.id}
+            
+            db.session.commit()
+            
+            submitted = [i for i, result in enumerate(results) if 'feedback_id' in result]
+            for i in submitted:
+                self._update_rl_training_data(patient_id, provider_id, feedback_data_list[i])
+            
+            return {
+                'success': True,
+                'feedback_ids': [results[i]['feedback_id'] for i in submitted],
+                'submitted_count': len(submitted),
+                'results': results,
+                'message': f'{len(submitted)} of {len(feedback_data_list)} feedback items submitted successfully',
+                'next_recommendations': self._get_next_recommendations(patient_id)
+            }
+            
+        except Exception as e:
+            logger.error(f"Error submitting bulk provider feedback: {str(e)}")
+            db.session.rollback()
+            return {'error': f'Failed to submit feedback: {str(e)}'}
+
     def get_provider_dashboard(self, provider_id: int) -> Dict:
         """Get comprehensive provider dashboard for exercise management"""
         try:
-            # Get provider's patients
-            patients = Patient.query.join(User).filter(User.role == 'patient').all()
-            
-            dashboard_data = {
-                'provider_id': provider_id,
-                'total_patients': len(patients),
-                'pending_reviews': 0,
-                'recent_feedback': [],
-                'patient_summaries': [],
-                'feedback_analytics': {},
-                'rl_training_progress': {}
-            }
+            self._get_models()
             
-            # Get pending reviews
-            for patient in patients:
-                pending_reviews = self._get_pending_reviews(patient.id, provider_id)
-                dashboard_data['pending_reviews'] += len(pending_reviews)
+            # Provider-level slices run on worker threads while patients are summarized here
+            app = current_app._get_current_object()
+            with ThreadPoolExecutor(max_workers=DASHBOARD_WORKERS) as executor:
+                recent_feedback = executor.submit(self._in_app_context, app, self._get_recent_feedback, provider_id)
+                feedback_analytics = executor.submit(self._in_app_context, app, self._get_feedback_analytics, provider_id)
                 
-                # Get patient summary
-                patient_summary = self._get_patient_summary(patient.id, provider_id)
-                dashboard_data['patient_summaries'].append(patient_summary)
-            
-            # Get recent feedback
-            dashboard_data['recent_feedback'] = self._get_recent_feedback(provider_id)
-            
-            # Get feedback analytics
-            dashboard_data['feedback_analytics'] = self._get_feedback_analytics(provider_id)
+                # Get provider's patients
+                patients = Patient.query.options(*self._loader_options())\
+                    .join(User).filter(User.role == 'patient').all()
+                
+                dashboard_data = {
+                    'provider_id': provider_id,
+                    'total_patients': len(patients),
+                    'pending_reviews': 0,
+                    'recent_feedback': [],
+                    'patient_summaries': [],
+                    'feedback_analytics': {},
+                    'rl_training_progress': {}
+                }
+                
+                # Get pending reviews
+                for patient in patients:
+                    pending_reviews = self._get_pending_reviews(patient.id, provider_id)
+                    dashboard_data['pending_reviews'] += len(pending_reviews)
+                
+                # Get patient summaries (bulk queries rather than per patient)
+                dashboard_data['patient_summaries'] = self._get_patient_summaries(patients, provider_id)
+                
+                dashboard_data['recent_feedback'] = recent_feedback.result()
+                dashboard_data['feedback_analytics'] = feedback_analytics.result()
             
             # Get RL training progress
             dashboard_data['rl_training_progress'] = self._get_rl_training_progress(provider_id)
@@ -214,29 +382,79 @@ class ProviderExerciseFeedbackService:
             logger.error(f"Error getting provider dashboard: {str(e)}")
             return {'error': f'Failed to get dashboard: {str(e)}'}
 
-    def get_rl_training_data(self, provider_id: int = None, limit: int = 1000) -> Dict:
-        """Get training data for reinforcement learning model"""
+    def get_rl_training_data(self, provider_id: int = None, limit: int = 1000,
+                             as_stream: bool = False) -> Union[Dict, Iterator[bytes]]:
+        """Get training data for reinforcement learning model
+        
+        With as_stream=True, returns an iterator of NDJSON lines (one encoded
+        training sample each) instead of building the full list and metrics.
+        """
         try:
-            # Get feedback data
-            query = ProviderExerciseFeedback.query
+            samples = self.iter_rl_training_data(provider_id, limit)
+            if as_stream:
+                return (_dumpb(sample) + b'\n' for sample in samples)
             
-            if provider_id:
-                query = query.filter_by(provider_id=provider_id)
+            training_data = list(samples)
             
-            feedback_records = query.order_by(desc(ProviderExerciseFeedback.submitted_at))\
-                .limit(limit).all()
+            return {
+                'training_data': training_data,
+                'total_samples': len(training_data),
+                'data_quality_metrics': self._calculate_data_quality_metrics(training_data),
+                'feature_importance': self._calculate_feature_importance(training_data)
+            }
             
-            training_data = []
+        except Exception as e:
+            logger.error(f"Error getting RL training data: {str(e)}")
+            return {'error': f'Failed to get training data: {str(e)}'}
+
+    def iter_rl_training_data(self, provider_id: int = None, limit: int = 1000) -> Iterator[Dict]:
+        """Iterate RL training samples, newest first, without materializing them
+        
+        Feedback rows are read from a server-side cursor (where the driver
+        supports one) as samples are consumed. Each chunk of rows loads only the
+        patient history around its own feedback (see _prefetch_training_history).
+        """
+        self._get_models()
+        
+        query = ProviderExerciseFeedback.query
+        
+        if provider_id:
+            query = query.filter_by(provider_id=provider_id)
+        
+        feedback_records = query.order_by(desc(ProviderExerciseFeedback.submitted_at))\
+            .limit(limit).execution_options(stream_results=True).yield_per(RL_EXPORT_CHUNK_SIZE)
+        
+        return self._iter_training_samples(feedback_records)
+
+    def _iter_training_samples(self, feedback_records: Iterable) -> Iterator[Dict]:
+        """Yield one RL training sample per feedback record
+        
+        Records are consumed RL_EXPORT_CHUNK_SIZE at a time; each chunk's patient
+        history is loaded in bulk and rewards are computed for the whole chunk.
+        """
+        records = iter(feedback_records)
+        patients = {}
+        while True:
+            chunk = list(islice(records, RL_EXPORT_CHUNK_SIZE))
+            if not chunk:
+                return
+            
+            history = self._prefetch_training_history(chunk, patients)
+            self._prime_exercise_contexts({record.exercise_type for record in chunk})
+            
+            rewards = self._calculate_reward_signals(
+                np.array([record.action for record in chunk], dtype=str),
+                np.array([record.feedback_category or '' for record in chunk], dtype=str)
+            )
             
-            for record in feedback_records:
+            for record, reward in zip(chunk, rewards.tolist()):
                 # Get patient context at time of feedback
-                patient_context = self._get_patient_context(record.patient_id, record.submitted_at)
+                patient_context = self._get_patient_context(record.patient_id, record.submitted_at, history)
                 
                 # Get exercise recommendation context
                 exercise_context = self._get_exercise_context(record.exercise_type)
                 
-                # Create training sample
-                training_sample = {
+                yield {
                     'patient_id': record.patient_id,
                     'provider_id': record.provider_id,
                     'timestamp': record.submitted_at.isoformat(),
@@ -246,33 +464,21 @@ class ProviderExerciseFeedbackService:
                     'provider_action': record.action,
                     'feedback_category': record.feedback_category,
                     'clinical_rationale': record.clinical_rationale,
-                    'reward_signal': self._calculate_reward_signal(record),
-                    'outcome_data': self._get_outcome_data(record.patient_id, record.submitted_at)
+                    'reward_signal': reward,
+                    'outcome_data': self._get_outcome_data(record.patient_id, record.submitted_at, history)
                 }
-                
-                training_data.append(training_sample)
-            
-            return {
-                'training_data': training_data,
-                'total_samples': len(training_data),
-                'data_quality_metrics': self._calculate_data_quality_metrics(training_data),
-                'feature_importance': self._calculate_feature_importance(training_data)
-            }
-            
-        except Exception as e:
-            logger.error(f"Error getting RL training data: {str(e)}")
-            return {'error': f'Failed to get training data: {str(e)}'}
 
     def _format_recommendations_for_provider(self, recommendations: Dict, 
-                                           patient: Patient, assessment: PHQ9Assessment) -> Dict:
+                                           patient: 'Patient', assessment: 'PHQ9Assessment') -> Dict:
         """Format exercise recommendations for provider review"""
+        now = datetime.now()
         formatted = {
             'severity_based_recommendations': recommendations.get('exercise_recommendations', {}),
             'schedule_plan': recommendations.get('schedule_plan', {}),
             'monitoring_plan': recommendations.get('monitoring_plan', {}),
             'safety_protocols': recommendations.get('safety_protocols', {}),
-            'recommendation_id': f"rec_{patient.id}_{assessment.id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
-            'generated_at': datetime.now().isoformat(),
+            'recommendation_id': f"rec_{patient.id}_{assessment.id}_{now.strftime('%Y%m%d_%H%M%S')}",
+            'generated_at': now.isoformat(),
             'rule_based_source': True
         }
         
@@ -281,7 +487,9 @@ class ProviderExerciseFeedbackService:
     def _get_exercise_history(self, patient_id: int) -> List[Dict]:
         """Get patient's exercise history"""
         try:
-            sessions = ExerciseSession.query.filter_by(patient_id=patient_id)\
+            # Eager-load the exercise so session.exercise.type doesn't query per row
+            sessions = ExerciseSession.query.options(*self._loader_options(joinedload(ExerciseSession.exercise)))\
+                .filter_by(patient_id=patient_id)\
                 .order_by(desc(ExerciseSession.start_time)).limit(20).all()
             
             history = []
@@ -304,7 +512,7 @@ class ProviderExerciseFeedbackService:
     def _get_previous_feedback(self, patient_id: int, provider_id: int) -> List[Dict]:
         """Get previous provider feedback for this patient"""
         try:
-            feedback_records = ProviderExerciseFeedback.query.filter_by(
+            feedback_records = ProviderExerciseFeedback.query.options(*self._loader_options()).filter_by(
                 patient_id=patient_id, provider_id=provider_id
             ).order_by(desc(ProviderExerciseFeedback.submitted_at)).limit(10).all()
             
@@ -315,8 +523,8 @@ class ProviderExerciseFeedbackService:
                     'action': record.action,
                     'category': record.feedback_category,
                     'rationale': record.clinical_rationale,
-                    'date': record.submitted_at.isoformat(),
-                    'modified_recommendations': json.loads(record.modified_recommendations) if record.modified_recommendations else {}
+                    'modified_recommendations': record.modified_recommendations or {},
+                    'date': record.submitted_at.isoformat()
                 })
             
             return feedback
@@ -325,14 +533,22 @@ class ProviderExerciseFeedbackService:
             logger.error(f"Error getting previous feedback: {str(e)}")
             return []
 
+    def _refresh_exercise_cache(self) -> None:
+        """Drop cached exercise catalog data once it is older than EXERCISE_CACHE_TTL"""
+        now = time.monotonic()
+        if now - self._exercise_cache_ts >= EXERCISE_CACHE_TTL:
+            self._available_exercises = None
+            self._exercise_contexts = {}
+            self._exercise_cache_ts = now
+
     def _get_available_exercises(self) -> List[Dict]:
         """Get all available exercises for provider to choose from"""
         try:
-            exercises = Exercise.query.all()
-            
-            available = []
-            for exercise in exercises:
-                available.append({
+            self._refresh_exercise_cache()
+            if self._available_exercises is None:
+                exercises = Exercise.query.all()
+                
+                self._available_exercises = tuple({
                     'id': exercise.id,
                     'type': exercise.type,
                     'name': exercise.name,
@@ -340,27 +556,60 @@ class ProviderExerciseFeedbackService:
                     'estimated_duration': exercise.estimated_duration,
                     'clinical_focus_areas': exercise.clinical_focus_areas,
                     'description': exercise.description
-                })
+                } for exercise in exercises)
             
-            return available
+            # Callers get their own copies, so changes to a response never reach the cache
+            return [dict(exercise) for exercise in self._available_exercises]
             
         except Exception as e:
             logger.error(f"Error getting available exercises: {str(e)}")
             return []
 
-    def _validate_feedback_data(self, feedback_data: Dict) -> bool:
-        """Validate provider feedback data"""
-        required_fields = ['action', 'exercise_type']
-        valid_actions = ['approve', 'reject', 'modify', 'add', 'remove']
+    def _add_feedback(self, patient_id: int, provider_id: int, feedback_data: Dict,
+                      submitted_at: datetime) -> 'ProviderExerciseFeedback':
+        """Add a feedback record and its action side effects to the session (no commit)"""
+        feedback_record = ProviderExerciseFeedback(
+            patient_id=patient_id,
+            provider_id=provider_id,
+            recommendation_id=feedback_data.get('recommendation_id'),
+            exercise_type=feedback_data.get('exercise_type'),
+            action=feedback_data.get('action'),  # approve, reject, modify, add, remove
+            feedback_category=feedback_data.get('category'),
+            feedback_text=feedback_data.get('feedback_text', ''),
+            modified_recommendations=feedback_data.get('modified_recommendations') or None,
+            clinical_rationale=feedback_data.get('clinical_rationale', ''),
+            submitted_at=submitted_at
+        )
+        
+        db.session.add(feedback_record)
+        self._apply_feedback_action(patient_id, feedback_data, submitted_at)
         
-        for field in required_fields:
-            if field not in feedback_data:
-                return False
+        return feedback_record
+
+    def _apply_feedback_action(self, patient_id: int, feedback_data: Dict, created_at: datetime) -> None:
+        """Create the session/recommendation implied by a feedback action"""
+        action = feedback_data.get('action')
         
-        if feedback_data['action'] not in valid_actions:
+        # If approved, create the actual exercise session/recommendation
+        if action == 'approve':
+            self._create_approved_exercise_session(patient_id, feedback_data)
+        
+        # If modified, create modified recommendation
+        elif action == 'modify':
+            self._create_modified_recommendation(patient_id, feedback_data, created_at)
+        
+        # If new exercise added, create new recommendation
+        elif action == 'add':
+            self._create_new_exercise_recommendation(patient_id, feedback_data, created_at)
+
+    def _validate_feedback_data(self, feedback_data: Dict) -> bool:
+        """Validate provider feedback data"""
+        if not all(field in feedback_data for field in REQUIRED_FEEDBACK_FIELDS):
             return False
         
-        return True
+        # Actions come from request JSON; unhashable values are simply invalid
+        action = feedback_data['action']
+        return isinstance(action, str) and action in VALID_FEEDBACK_ACTIONS
 
     def _create_approved_exercise_session(self, patient_id: int, feedback_data: Dict) -> None:
         """Create exercise session for approved recommendation"""
@@ -372,16 +621,16 @@ class ProviderExerciseFeedbackService:
         except Exception as e:
             logger.error(f"Error creating approved exercise session: {str(e)}")
 
-    def _create_modified_recommendation(self, patient_id: int, feedback_data: Dict) -> None:
+    def _create_modified_recommendation(self, patient_id: int, feedback_data: Dict, created_at: datetime) -> None:
         """Create modified exercise recommendation"""
         try:
             # Store modified recommendation
             modified_rec = RecommendationResult(
                 patient_id=patient_id,
                 recommendation_type='exercise_modified',
-                recommendation_data=json.dumps(feedback_data.get('modified_recommendations', {})),
+                recommendation_data=_dumps_optional(feedback_data.get('modified_recommendations')),
                 provider_feedback=feedback_data.get('clinical_rationale', ''),
-                created_at=datetime.now()
+                created_at=created_at
             )
             
             db.session.add(modified_rec)
@@ -389,18 +638,18 @@ class ProviderExerciseFeedbackService:
         except Exception as e:
             logger.error(f"Error creating modified recommendation: {str(e)}")
 
-    def _create_new_exercise_recommendation(self, patient_id: int, feedback_data: Dict) -> None:
+    def _create_new_exercise_recommendation(self, patient_id: int, feedback_data: Dict, created_at: datetime) -> None:
         """Create new exercise recommendation added by provider"""
         try:
             new_rec = RecommendationResult(
                 patient_id=patient_id,
                 recommendation_type='exercise_added',
-                recommendation_data=json.dumps({
+                recommendation_data=_dumps({
                     'exercise_type': feedback_data.get('exercise_type'),
                     'added_by_provider': True,
                     'clinical_rationale': feedback_data.get('clinical_rationale', '')
                 }),
-                created_at=datetime.now()
+                created_at=created_at
             )
             
             db.session.add(new_rec)
@@ -440,37 +689,68 @@ class ProviderExerciseFeedbackService:
             logger.error(f"Error getting pending reviews: {str(e)}")
             return []
 
-    def _get_patient_summary(self, patient_id: int, provider_id: int) -> Dict:
-        """Get patient summary for provider dashboard"""
+    def _get_patient_summaries(self, patients: List, provider_id: int) -> List[Dict]:
+        """Get dashboard summaries for many patients with a fixed number of queries"""
         try:
-            patient = Patient.query.get(patient_id)
-            if not patient:
-                return {}
+            patient_ids = [patient.id for patient in patients]
+            if not patient_ids:
+                return []
+            
+            # Latest assessment per patient
+            latest_dates = db.session.query(
+                PHQ9Assessment.patient_id,
+                func.max(PHQ9Assessment.assessment_date).label('latest_date')
+            ).filter(PHQ9Assessment.patient_id.in_(patient_ids))\
+                .group_by(PHQ9Assessment.patient_id).subquery()
+            
+            latest_assessments = {
+                assessment.patient_id: assessment
+                for assessment in PHQ9Assessment.query.options(*self._loader_options()).join(
+                    latest_dates,
+                    and_(
+                        PHQ9Assessment.patient_id == latest_dates.c.patient_id,
+                        PHQ9Assessment.assessment_date == latest_dates.c.latest_date
+                    )
+                )
+            }
             
-            latest_assessment = PHQ9Assessment.query.filter_by(patient_id=patient_id)\
-                .order_by(desc(PHQ9Assessment.assessment_date)).first()
+            # Feedback count and most recent submission per patient
+            feedback_stats = {
+                patient_id: (count, last_submitted)
+                for patient_id, count, last_submitted in db.session.query(
+                    ProviderExerciseFeedback.patient_id,
+                    func.count(ProviderExerciseFeedback.id),
+                    func.max(ProviderExerciseFeedback.submitted_at)
+                ).filter(
+                    ProviderExerciseFeedback.provider_id == provider_id,
+                    ProviderExerciseFeedback.patient_id.in_(patient_ids)
+                ).group_by(ProviderExerciseFeedback.patient_id)
+            }
             
-            recent_feedback = ProviderExerciseFeedback.query.filter_by(
-                patient_id=patient_id, provider_id=provider_id
-            ).order_by(desc(ProviderExerciseFeedback.submitted_at)).limit(5).all()
+            summaries = []
+            for patient in patients:
+                latest_assessment = latest_assessments.get(patient.id)
+                feedback_count, last_feedback = feedback_stats.get(patient.id, (0, None))
+                summaries.append({
+                    'patient_id': patient.id,
+                    'name': f"{patient.first_name} {patient.last_name}",
+                    'current_severity': latest_assessment.severity_level if latest_assessment else 'unknown',
+                    'last_assessment': latest_assessment.assessment_date.isoformat() if latest_assessment else None,
+                    'recent_feedback_count': min(feedback_count, 5),
+                    'last_feedback': last_feedback.isoformat() if last_feedback else None
+                })
             
-            return {
-                'patient_id': patient.id,
-                'name': f"{patient.first_name} {patient.last_name}",
-                'current_severity': latest_assessment.severity_level if latest_assessment else 'unknown',
-                'last_assessment': latest_assessment.assessment_date.isoformat() if latest_assessment else None,
-                'recent_feedback_count': len(recent_feedback),
-                'last_feedback': recent_feedback[0].submitted_at.isoformat() if recent_feedback else None
-            }
+            return summaries
             
         except Exception as e:
-            logger.error(f"Error getting patient summary: {str(e)}")
-            return {}
+            logger.error(f"Error getting patient summaries: {str(e)}")
+            return []
 
     def _get_recent_feedback(self, provider_id: int) -> List[Dict]:
         """Get recent feedback from provider"""
         try:
-            recent_feedback = ProviderExerciseFeedback.query.filter_by(provider_id=provider_id)\
+            recent_feedback = ProviderExerciseFeedback.query.options(*self._loader_options())\
+                .filter_by(provider_id=provider_id)\
                 .order_by(desc(ProviderExerciseFeedback.submitted_at)).limit(10).all()
             
             feedback = []
@@ -492,23 +772,33 @@ class ProviderExerciseFeedbackService:
     def _get_feedback_analytics(self, provider_id: int) -> Dict:
         """Get feedback analytics for provider"""
         try:
-            # Get feedback statistics
-            total_feedback = ProviderExerciseFeedback.query.filter_by(provider_id=provider_id).count()
-            
-            action_counts = db.session.query(
-                ProviderExerciseFeedback.action,
-                func.count(ProviderExerciseFeedback.id)
-            ).filter_by(provider_id=provider_id).group_by(ProviderExerciseFeedback.action).all()
-            
-            category_counts = db.session.query(
-                ProviderExerciseFeedback.feedback_category,
-                func.count(ProviderExerciseFeedback.id)
-            ).filter_by(provider_id=provider_id).group_by(ProviderExerciseFeedback.feedback_category).all()
+            # Get feedback statistics: total, per action and per category in one
+            # round trip (UNION ALL; GROUPING SETS isn't available on SQLite)
+            feedback = ProviderExerciseFeedback
+            by_provider = feedback.provider_id == provider_id
+            rows = db.session.execute(union_all(
+                select(literal('total'), literal(None, String), func.count(feedback.id)).where(by_provider),
+                select(literal('action'), feedback.action, func.count(feedback.id))
+                    .where(by_provider).group_by(feedback.action),
+                select(literal('category'), feedback.feedback_category, func.count(feedback.id))
+                    .where(by_provider).group_by(feedback.feedback_category)
+            )).all()
+            
+            total_feedback = 0
+            action_counts = {}
+            category_counts = {}
+            for bucket, value, count in rows:
+                if bucket == 'total':
+                    total_feedback = count
+                elif bucket == 'action':
+                    action_counts[value] = count
+                else:
+                    category_counts[value] = count
             
             return {
                 'total_feedback': total_feedback,
-                'action_distribution': dict(action_counts),
-                'category_distribution': dict(category_counts),
+                'action_distribution': action_counts,
+                'category_distribution': category_counts,
                 'feedback_trends': self._calculate_feedback_trends(provider_id)
             }
             
@@ -532,36 +822,95 @@ class ProviderExerciseFeedbackService:
             logger.error(f"Error getting RL training progress: {str(e)}")
             return {}
 
-    def _get_patient_context(self, patient_id: int, timestamp: datetime) -> Dict:
+    def _prefetch_training_history(self, chunk: List, patients: Dict) -> Dict:
+        """Load the patients and the PHQ-9, mood and exercise rows a chunk of feedback reads
+        
+        Per patient only the rows around the chunk's feedback are loaded: the latest
+        assessment and the last RL_MOOD_WINDOW moods / RL_SESSION_WINDOW sessions at
+        or before its first feedback, everything up to its last feedback, and the
+        moods / sessions after that which serve as outcome data. `patients` is kept
+        by the caller across chunks, so each Patient row is loaded once per export.
+        
+        Returns {'patients': {id: Patient}, 'assessments' / 'moods' / 'sessions':
+        {patient_id: (dates, rows)}} so point-in-time lookups can bisect on dates.
+        """
+        history = {'patients': patients, 'assessments': {}, 'moods': {}, 'sessions': {}}
+        if not chunk:
+            return history
+        
+        patient_ids = {record.patient_id for record in chunk}
+        missing = patient_ids - patients.keys()
+        if missing:
+            patients.update((patient.id, patient) for patient in Patient.query.filter(Patient.id.in_(missing)))
+        
+        # First and last feedback time per patient in this chunk
+        bounds = select(
+            ProviderExerciseFeedback.patient_id,
+            func.min(ProviderExerciseFeedback.submitted_at).label('first_at'),
+            func.max(ProviderExerciseFeedback.submitted_at).label('last_at')
+        ).where(
+            ProviderExerciseFeedback.id.in_([record.id for record in chunk])
+        ).group_by(ProviderExerciseFeedback.patient_id).subquery()
+        
+        sources = (
+            ('assessments', PHQ9Assessment, PHQ9Assessment.query, PHQ9Assessment.assessment_date, 'assessment_date', 1, 0),
+            ('moods', MoodEntry, MoodEntry.query, MoodEntry.timestamp, 'timestamp', RL_MOOD_WINDOW, RL_MOOD_WINDOW),
+            ('sessions', ExerciseSession, ExerciseSession.query.options(joinedload(ExerciseSession.exercise)),
+             ExerciseSession.start_time, 'start_time', RL_SESSION_WINDOW, RL_SESSION_WINDOW),
+        )
+        for key, model, query, date_col, date_attr, before, after in sources:
+            window = self._history_window_ids(model, date_col, bounds, before, after)
+            grouped = history[key]
+            for row in query.filter(model.id.in_(window)).order_by(date_col):
+                dates, rows = grouped.setdefault(row.patient_id, ([], []))
+                dates.append(getattr(row, date_attr))
+                rows.append(row)
+        
+        return history
+
+    def _history_window_ids(self, model, date_col, bounds, before: int, after: int):
+        """Ids of each bounded patient's rows: `before` at or before first_at, all up to last_at, `after` past it"""
+        in_bounds = bounds.c.patient_id == model.patient_id
+        
+        earlier = select(
+            model.id,
+            func.row_number().over(partition_by=model.patient_id, order_by=date_col.desc()).label('rn')
+        ).join(bounds, in_bounds).where(date_col <= bounds.c.first_at).subquery()
+        selects = [
+            select(earlier.c.id).where(earlier.c.rn <= before),
+            select(model.id).join(bounds, in_bounds).where(date_col > bounds.c.first_at, date_col <= bounds.c.last_at)
+        ]
+        
+        if after:
+            later = select(
+                model.id,
+                func.row_number().over(partition_by=model.patient_id, order_by=date_col).label('rn')
+            ).join(bounds, in_bounds).where(date_col > bounds.c.last_at).subquery()
+            selects.append(select(later.c.id).where(later.c.rn <= after))
+        
+        return union_all(*selects)
+
+    def _get_patient_context(self, patient_id: int, timestamp: datetime, history: Dict) -> Dict:
         """Get patient context at specific timestamp for RL training"""
         try:
-            patient = Patient.query.get(patient_id)
+            patient = history['patients'].get(patient_id)
             if not patient:
                 return {}
             
-            # Get assessment at or before timestamp
-            assessment = PHQ9Assessment.query.filter(
-                and_(
-                    PHQ9Assessment.patient_id == patient_id,
-                    PHQ9Assessment.assessment_date <= timestamp
-                )
-            ).order_by(desc(PHQ9Assessment.assessment_date)).first()
+            # Assessment at or before timestamp
+            dates, assessments = history['assessments'].get(patient_id, ([], []))
+            idx = bisect_right(dates, timestamp)
+            assessment = assessments[idx - 1] if idx else None
             
-            # Get mood entries around timestamp
-            mood_entries = MoodEntry.query.filter(
-                and_(
-                    MoodEntry.patient_id == patient_id,
-                    MoodEntry.entry_date <= timestamp
-                )
-            ).order_by(desc(MoodEntry.entry_date)).limit(7).all()
+            # Last 7 mood entries at or before timestamp, newest first
+            dates, mood_entries = history['moods'].get(patient_id, ([], []))
+            idx = bisect_right(dates, timestamp)
+            mood_entries = mood_entries[max(idx - RL_MOOD_WINDOW, 0):idx][::-1]
             
-            # Get exercise history before timestamp
-            exercise_history = ExerciseSession.query.filter(
-                and_(
-                    ExerciseSession.patient_id == patient_id,
-                    ExerciseSession.start_time <= timestamp
-                )
-            ).order_by(desc(ExerciseSession.start_time)).limit(10).all()
+            # Last 10 exercise sessions at or before timestamp, newest first
+            dates, sessions = history['sessions'].get(patient_id, ([], []))
+            idx = bisect_right(dates, timestamp)
+            exercise_history = sessions[max(idx - RL_SESSION_WINDOW, 0):idx][::-1]
             
             return {
                 'patient_id': patient_id,
@@ -573,7 +922,7 @@ class ProviderExerciseFeedbackService:
                     'q9_risk': assessment.q9_risk_flag if assessment else False,
                     'assessment_date': assessment.assessment_date.isoformat() if assessment else None
                 },
-                'mood_trend': [entry.mood_score for entry in mood_entries],
+                'mood_trend': [entry.intensity_level for entry in mood_entries],
                 'exercise_history': [{
                     'type': session.exercise.type,
                     'completion_status': session.completion_status,
@@ -587,74 +936,76 @@ class ProviderExerciseFeedbackService:
             logger.error(f"Error getting patient context: {str(e)}")
             return {}
 
+    def _prime_exercise_contexts(self, exercise_types: set) -> None:
+        """Fill the exercise context cache for all given types with one query"""
+        self._refresh_exercise_cache()
+        missing = exercise_types - self._exercise_contexts.keys()
+        if not missing:
+            return
+        
+        for exercise in Exercise.query.filter(Exercise.type.in_(missing)).order_by(Exercise.id):
+            if exercise.type not in self._exercise_contexts:
+                self._exercise_contexts[exercise.type] = self._build_exercise_context(exercise)
+        for exercise_type in missing:
+            self._exercise_contexts.setdefault(exercise_type, {})
+
     def _get_exercise_context(self, exercise_type: str) -> Dict:
         """Get exercise context for RL training"""
         try:
+            self._refresh_exercise_cache()
+            if exercise_type in self._exercise_contexts:
+                return self._exercise_contexts[exercise_type]
+            
             exercise = Exercise.query.filter_by(type=exercise_type).first()
-            if not exercise:
-                return {}
+            context = self._build_exercise_context(exercise) if exercise else {}
             
-            return {
-                'exercise_id': exercise.id,
-                'type': exercise.type,
-                'name': exercise.name,
-                'difficulty_level': exercise.difficulty_level,
-                'estimated_duration': exercise.estimated_duration,
-                'clinical_focus_areas': exercise.clinical_focus_areas,
-                'engagement_mechanics': exercise.engagement_mechanics
-            }
+            self._exercise_contexts[exercise_type] = context
+            return context
             
         except Exception as e:
             logger.error(f"Error getting exercise context: {str(e)}")
             return {}
 
-    def _calculate_reward_signal(self, feedback_record) -> float:
-        """Calculate reward signal for RL training"""
-        try:
-            # Simple reward calculation based on provider action
-            reward_map = {
-                'approve': 1.0,
-                'modify': 0.5,
-                'add': 0.8,
-                'reject': -0.5,
-                'remove': -0.3
-            }
-            
-            base_reward = reward_map.get(feedback_record.action, 0.0)
-            
-            # Adjust based on feedback category
-            if feedback_record.feedback_category == 'safety_concerns':
-                base_reward *= 1.5  # Higher weight for safety
-            elif feedback_record.feedback_category == 'effectiveness':
-                base_reward *= 1.2  # Higher weight for effectiveness
-            
-            return base_reward
-            
-        except Exception as e:
-            logger.error(f"Error calculating reward signal: {str(e)}")
-            return 0.0
+    def _build_exercise_context(self, exercise) -> Dict:
+        """Exercise fields used as RL training context"""
+        return {
+            'exercise_id': exercise.id,
+            'type': exercise.type,
+            'name': exercise.name,
+            'difficulty_level': exercise.difficulty_level,
+            'estimated_duration': exercise.estimated_duration,
+            'clinical_focus_areas': exercise.clinical_focus_areas,
+            'engagement_mechanics': exercise.engagement_mechanics
+        }
 
-    def _get_outcome_data(self, patient_id: int, timestamp: datetime) -> Dict:
+    def _calculate_reward_signals(self, actions: np.ndarray, categories: np.ndarray) -> np.ndarray:
+        """Calculate reward signals for RL training, one per feedback record"""
+        base_rewards = np.select(
+            [actions == action for action in REWARD_BY_ACTION], list(REWARD_BY_ACTION.values()), 0.0
+        )
+        
+        # Adjust based on feedback category
+        weights = np.select(
+            [categories == category for category in REWARD_CATEGORY_WEIGHTS], list(REWARD_CATEGORY_WEIGHTS.values()), 1.0
+        )
+        
+        return base_rewards * weights
+
+    def _get_outcome_data(self, patient_id: int, timestamp: datetime, history: Dict) -> Dict:
         """Get outcome data for RL training"""
         try:
-            # Get mood improvement after feedback
-            mood_after = MoodEntry.query.filter(
-                and_(
-                    MoodEntry.patient_id == patient_id,
-                    MoodEntry.entry_date > timestamp
-                )
-            ).order_by(MoodEntry.entry_date).limit(7).all()
+            # Mood entries after feedback (next 7)
+            dates, mood_entries = history['moods'].get(patient_id, ([], []))
+            idx = bisect_right(dates, timestamp)
+            mood_after = mood_entries[idx:idx + RL_MOOD_WINDOW]
             
-            # Get exercise completion after feedback
-            exercises_after = ExerciseSession.query.filter(
-                and_(
-                    ExerciseSession.patient_id == patient_id,
-                    ExerciseSession.start_time > timestamp
-                )
-            ).order_by(ExerciseSession.start_time).limit(10).all()
+            # Exercise sessions after feedback (next 10)
+            dates, sessions = history['sessions'].get(patient_id, ([], []))
+            idx = bisect_right(dates, timestamp)
+            exercises_after = sessions[idx:idx + RL_SESSION_WINDOW]
             
             return {
-                'mood_improvement': [entry.mood_score for entry in mood_after],
+                'mood_improvement': [entry.intensity_level for entry in mood_after],
                 'exercise_completion': [session.completion_status for session in exercises_after],
                 'engagement_scores': [session.engagement_score for session in exercises_after if session.engagement_score],
                 'outcome_period_days': 7
@@ -665,20 +1016,40 @@ class ProviderExerciseFeedbackService:
             return {}
 
     def _calculate_data_quality_metrics(self, training_data: List[Dict]) -> Dict:
-        """Calculate data quality metrics for RL training"""
+        """Calculate data quality metrics for RL training
+        
+        Completeness, reward and feedback distribution are accumulated in a
+        single pass over the samples.
+        """
         try:
             if not training_data:
                 return {}
             
-            total_samples = len(training_data)
-            complete_samples = sum(1 for sample in training_data if sample.get('patient_context') and sample.get('exercise_context'))
+            complete_samples = 0
+            reward_sum = 0.0
+            action_counts = Counter()
+            category_counts = Counter()
+            for sample in training_data:
+                if sample['patient_context'] and sample['exercise_context']:
+                    complete_samples += 1
+                reward_sum += sample.get('reward_signal', 0)
+                action = sample.get('provider_action')
+                if action:
+                    action_counts[action] += 1
+                category = sample.get('feedback_category')
+                if category:
+                    category_counts[category] += 1
             
+            total_samples = len(training_data)
             return {
                 'total_samples': total_samples,
                 'complete_samples': complete_samples,
-                'completeness_rate': complete_samples / total_samples if total_samples > 0 else 0,
-                'average_reward': sum(sample.get('reward_signal', 0) for sample in training_data) / total_samples if total_samples > 0 else 0,
-                'feedback_distribution': self._calculate_feedback_distribution(training_data)
+                'completeness_rate': complete_samples / total_samples,
+                'average_reward': reward_sum / total_samples,
+                'feedback_distribution': {
+                    'action_distribution': dict(sorted(action_counts.items())),
+                    'category_distribution': dict(sorted(category_counts.items()))
+                }
             }
             
         except Exception as e:
@@ -691,21 +1062,19 @@ class ProviderExerciseFeedbackService:
             # Simple feature importance calculation
             # In practice, you'd use more sophisticated methods
             
-            feature_counts = {}
+            feature_counts = Counter()
             for sample in training_data:
-                patient_context = sample.get('patient_context', {})
-                assessment_data = patient_context.get('assessment_data', {})
+                assessment_data = sample.get('patient_context', {}).get('assessment_data', {})
                 
                 # Count features
                 severity = assessment_data.get('severity_level')
                 if severity:
-                    feature_counts[f'severity_{severity}'] = feature_counts.get(f'severity_{severity}', 0) + 1
+                    feature_counts[f'severity_{severity}'] += 1
                 
-                q9_risk = assessment_data.get('q9_risk')
-                if q9_risk:
-                    feature_counts['q9_risk'] = feature_counts.get('q9_risk', 0) + 1
+                if assessment_data.get('q9_risk'):
+                    feature_counts['q9_risk'] += 1
             
-            return feature_counts
+            return dict(feature_counts)
             
         except Exception as e:
             logger.error(f"Error calculating feature importance: {str(e)}")
@@ -714,56 +1083,34 @@ class ProviderExerciseFeedbackService:
     def _calculate_feedback_trends(self, provider_id: int) -> Dict:
         """Calculate feedback trends over time"""
         try:
-            # Get feedback over last 30 days
-            thirty_days_ago = datetime.now() - timedelta(days=30)
+            # Get feedback over the trend window
+            since = _utcnow() - FEEDBACK_TREND_WINDOW
             
-            recent_feedback = ProviderExerciseFeedback.query.filter(
+            # Per-day counts are aggregated by the database
+            day = func.date(ProviderExerciseFeedback.submitted_at)
+            rows = db.session.query(day, func.count(ProviderExerciseFeedback.id)).filter(
                 and_(
                     ProviderExerciseFeedback.provider_id == provider_id,
-                    ProviderExerciseFeedback.submitted_at >= thirty_days_ago
+                    ProviderExerciseFeedback.submitted_at >= since
                 )
-            ).all()
+            ).group_by(day).all()
             
-            # Calculate trends
-            daily_counts = {}
-            for feedback in recent_feedback:
-                date_key = feedback.submitted_at.date().isoformat()
-                daily_counts[date_key] = daily_counts.get(date_key, 0) + 1
+            # SQLite returns DATE() as a string, other backends as a date
+            daily_counts = {
+                (day_value if isinstance(day_value, str) else day_value.isoformat()): count
+                for day_value, count in rows
+            }
+            total_feedback = sum(daily_counts.values())
             
             return {
                 'daily_feedback_counts': daily_counts,
-                'average_daily_feedback': len(recent_feedback) / 30,
-                'trend_direction': 'increasing' if len(recent_feedback) > 15 else 'stable'
+                'average_daily_feedback': total_feedback / FEEDBACK_TREND_DAYS,
+                'trend_direction': 'increasing' if total_feedback > 15 else 'stable'
             }
             
         except Exception as e:
             logger.error(f"Error calculating feedback trends: {str(e)}")
             return {}
 
-    def _calculate_feedback_distribution(self, training_data: List[Dict]) -> Dict:
-        """Calculate feedback distribution for data quality"""
-        try:
-            action_counts = {}
-            category_counts = {}
-            
-            for sample in training_data:
-                action = sample.get('provider_action')
-                category = sample.get('feedback_category')
-                
-                if action:
-                    action_counts[action] = action_counts.get(action, 0) + 1
-                
-                if category:
-                    category_counts[category] = category_counts.get(category, 0) + 1
-            
-            return {
-                'action_distribution': action_counts,
-                'category_distribution': category_counts
-            }
-            
-        except Exception as e:
-            logger.error(f"Error calculating feedback distribution: {str(e)}")
-            return {}
-
 # Initialize the feedback system
 provider_exercise_feedback = ProviderExerciseFeedbackService()
@@ -4,23 +4,48 @@ Provider Feedback Routes
 Flask routes for provider exercise feedback system
 """
 
-from flask import Blueprint, render_template, request, jsonify, redirect, url_for, flash
+from flask import Blueprint, Response, current_app, render_template, request, jsonify, make_response, redirect, url_for, flash, stream_with_context
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-import json
+import csv
+import hashlib
 import logging
+import time
+from functools import wraps
+from operator import itemgetter
+from sqlalchemy import and_, func, select
 
 from provider_exercise_feedback_system import provider_exercise_feedback
 
+try:
+    from flask_caching import Cache
+    cache = Cache()
+    CACHE_AVAILABLE = True
+except ImportError:
+    cache = None
+    CACHE_AVAILABLE = False
+
 # Create blueprint
 provider_feedback_bp = Blueprint('provider_feedback', __name__)
 
 logger = logging.getLogger(__name__)
 
-def get_models():
-    """Get database models (to avoid circular imports)"""
+# Per-provider cache keys for read-only views; dashboard/analytics are dropped on feedback writes
+DASHBOARD_CACHE_KEY = 'prov_dash_{}'
+ANALYTICS_CACHE_KEY = 'prov_analytics_{}'
+
+@provider_feedback_bp.record_once
+def init_cache(state):
+    """Bind the response cache to the app (SimpleCache unless CACHE_TYPE is configured, e.g. RedisCache)"""
+    if CACHE_AVAILABLE:
+        # Default on this cache instance only, so app.config is left to the app
+        cache.init_app(state.app, config={'CACHE_TYPE': state.app.config.get('CACHE_TYPE', 'SimpleCache')})
+
+@provider_feedback_bp.record_once
+def init_models(state):
+    """Resolve the database models once at registration (avoids circular imports at module load)"""
     import app_ml_complete
-    return {
+    state.app.extensions['feedback_models'] = {
         'db': app_ml_complete.db,
         'Patient': app_ml_complete.Patient,
         'User': app_ml_complete.User,
@@ -29,6 +54,118 @@ def get_models():
         'Exercise': getattr(app_ml_complete, 'Exercise', None)
     }
 
+def _cacheable(response) -> bool:
+    """Only cache successful payloads, not error responses"""
+    if isinstance(response, tuple) or response.status_code != 200:
+        return False
+    payload = response.get_json(silent=True)
+    return not (isinstance(payload, dict) and 'error' in payload)
+
+def provider_required(f):
+    """Require a logged-in provider; anyone else gets a JSON 403 before the view (or its cache) runs"""
+    @wraps(f)
+    @login_required
+    def decorated(*args, **kwargs):
+        if getattr(current_user, 'role', None) != 'provider':
+            return jsonify({'error': 'Access denied'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+def cached_per_user(timeout: int, key: str):
+    """Cache a view's response per current user (no-op without Flask-Caching)
+    
+    Apply below @provider_required so the key is only built for authorized users.
+    """
+    def decorator(f):
+        if not CACHE_AVAILABLE:
+            return f
+        return cache.cached(
+            timeout=timeout,
+            key_prefix=lambda: key.format(current_user.id),
+            response_filter=_cacheable
+        )(f)
+    return decorator
+
+def etag_per_provider(max_age: int):
+    """Answer If-None-Match with 304 while the provider's feedback is unchanged
+    
+    The ETag covers the provider's latest/total feedback plus a max_age-second
+    window, since the views also show patient data that feedback writes don't
+    touch. Apply between @provider_required and @cached_per_user.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            try:
+                models = current_app.extensions['feedback_models']
+                feedback = models['ProviderExerciseFeedback']
+                latest, total = models['db'].session.query(
+                    func.max(feedback.submitted_at), func.count(feedback.id)
+                ).filter(feedback.provider_id == current_user.id).one()
+                etag = hashlib.md5(
+                    f'{current_user.id}:{latest}:{total}:{int(time.time() // max_age)}'.encode()
+                ).hexdigest()
+            except Exception as e:
+                logger.error(f"Error computing feedback ETag: {str(e)}")
+                return f(*args, **kwargs)
+            
+            # Response compression (Flask-Compress) sends the tag back as "<etag>:<encoding>"
+            client_tags = {tag.split(':', 1)[0] for tag in request.if_none_match.as_set(include_weak=True)}
+            if etag in client_tags:
+                response = Response(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            return response
+        return decorated
+    return decorator
+
+def invalidate_provider_cache(provider_id: int) -> None:
+    """Drop cached dashboard/analytics responses after a provider's feedback changes"""
+    if CACHE_AVAILABLE:
+        cache.delete_many(DASHBOARD_CACHE_KEY.format(provider_id), ANALYTICS_CACHE_KEY.format(provider_id))
+
+# RL training CSV layout
+TRAINING_CSV_HEADER = (
+    'patient_id', 'provider_id', 'timestamp', 'exercise_type', 'action',
+    'feedback_category', 'clinical_rationale', 'reward_signal',
+    'severity_level', 'phq9_score', 'q9_risk', 'mood_trend', 'engagement_score'
+)
+_sample_ids = itemgetter('patient_id', 'provider_id')
+_sample_feedback = itemgetter(
+    'recommended_exercise', 'provider_action', 'feedback_category', 'clinical_rationale', 'reward_signal'
+)
+
+class _EchoWriter:
+    """File-like object whose write() returns the line, so csv.writer rows can be yielded"""
+    def write(self, value):
+        return value
+
+def _generate_training_csv(samples):
+    """Yield the RL training CSV one line at a time"""
+    writer = csv.writer(_EchoWriter())
+    writerow = writer.writerow
+    
+    yield writerow(TRAINING_CSV_HEADER)
+    
+    for sample in samples:
+        patient_context = sample.get('patient_context') or {}
+        assessment_data = patient_context.get('assessment_data') or {}
+        engagement = [ex.get('engagement_score', 0) for ex in patient_context.get('exercise_history', ())]
+        
+        yield writerow((
+            *_sample_ids(sample),
+            sample.get('timestamp'),
+            *_sample_feedback(sample),
+            assessment_data.get('severity_level'),
+            assessment_data.get('total_score'),
+            assessment_data.get('q9_risk'),
+            ','.join(map(str, patient_context.get('mood_trend', ()))),
+            ','.join(map(str, engagement))
+        ))
+
 @provider_feedback_bp.route('/exercise_feedback')
 @login_required
 def exercise_feedback_dashboard():
@@ -40,12 +177,11 @@ def exercise_feedback_dashboard():
     return render_template('provider_exercise_feedback.html')
 
 @provider_feedback_bp.route('/api/provider_exercise_dashboard')
-@login_required
+@provider_required
+@etag_per_provider(60)
+@cached_per_user(60, DASHBOARD_CACHE_KEY)
 def api_provider_dashboard():
     """API endpoint for provider dashboard data"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
     try:
         dashboard_data = provider_exercise_feedback.get_provider_dashboard(current_user.id)
         return jsonify(dashboard_data)
@@ -54,33 +190,43 @@ def api_provider_dashboard():
         return jsonify({'error': 'Failed to get dashboard data'}), 500
 
 @provider_feedback_bp.route('/api/patients')
-@login_required
+@provider_required
 def api_get_patients():
     """API endpoint to get all patients"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
     try:
-        models = get_models()
+        models = current_app.extensions['feedback_models']
+        db = models['db']
         Patient = models['Patient']
         PHQ9Assessment = models['PHQ9Assessment']
         
-        patients = Patient.query.all()
-        patient_data = []
+        # Latest assessment per patient, joined in the same query
+        latest = select(
+            PHQ9Assessment.patient_id,
+            PHQ9Assessment.severity_level,
+            PHQ9Assessment.assessment_date,
+            func.row_number().over(
+                partition_by=PHQ9Assessment.patient_id,
+                order_by=PHQ9Assessment.assessment_date.desc()
+            ).label('rn')
+        ).subquery()
         
-        for patient in patients:
-            latest_assessment = PHQ9Assessment.query.filter_by(patient_id=patient.id)\
-                .order_by(PHQ9Assessment.assessment_date.desc()).first()
-            
-            patient_data.append({
-                'id': patient.id,
-                'first_name': patient.first_name,
-                'last_name': patient.last_name,
-                'age': patient.age,
-                'gender': patient.gender,
-                'current_phq9_severity': latest_assessment.severity_level if latest_assessment else 'unknown',
-                'last_assessment_date': latest_assessment.assessment_date.isoformat() if latest_assessment else None
-            })
+        rows = db.session.execute(
+            select(
+                Patient.id, Patient.first_name, Patient.last_name, Patient.age, Patient.gender,
+                latest.c.severity_level, latest.c.assessment_date
+            ).outerjoin(latest, and_(latest.c.patient_id == Patient.id, latest.c.rn == 1))
+            .order_by(Patient.id)
+        ).mappings()
+        
+        patient_data = [{
+            'id': row['id'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'age': row['age'],
+            'gender': row['gender'],
+            'current_phq9_severity': row['severity_level'] or 'unknown',
+            'last_assessment_date': row['assessment_date'].isoformat() if row['assessment_date'] else None
+        } for row in rows]
         
         return jsonify({'patients': patient_data})
     except Exception as e:
@@ -88,12 +234,9 @@ def api_get_patients():
         return jsonify({'error': 'Failed to get patients'}), 500
 
 @provider_feedback_bp.route('/api/patient_exercise_recommendations/<int:patient_id>')
-@login_required
+@provider_required
 def api_patient_recommendations(patient_id):
     """API endpoint to get patient exercise recommendations"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
     try:
         recommendations = provider_exercise_feedback.get_patient_exercise_recommendations(
             patient_id, current_user.id
@@ -104,12 +247,9 @@ def api_patient_recommendations(patient_id):
         return jsonify({'error': 'Failed to get recommendations'}), 500
 
 @provider_feedback_bp.route('/api/submit_provider_feedback/<int:patient_id>', methods=['POST'])
-@login_required
+@provider_required
 def api_submit_feedback(patient_id):
     """API endpoint to submit provider feedback"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
     try:
         feedback_data = request.get_json()
         
@@ -120,34 +260,29 @@ def api_submit_feedback(patient_id):
             patient_id, current_user.id, feedback_data
         )
         
+        if result.get('success'):
+            invalidate_provider_cache(current_user.id)
+        
         return jsonify(result)
     except Exception as e:
         logger.error(f"Error submitting feedback: {str(e)}")
         return jsonify({'error': 'Failed to submit feedback'}), 500
 
 @provider_feedback_bp.route('/api/available_exercises')
-@login_required
+@provider_required
+@cached_per_user(300, 'available_exercises_{}')
 def api_available_exercises():
     """API endpoint to get available exercises"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
     try:
-        from app_ml_complete import Exercise
-        
-        exercises = Exercise.query.all()
-        exercise_data = []
+        models = current_app.extensions['feedback_models']
+        db = models['db']
+        Exercise = models['Exercise']
         
-        for exercise in exercises:
-            exercise_data.append({
-                'id': exercise.id,
-                'type': exercise.type,
-                'name': exercise.name,
-                'difficulty_level': exercise.difficulty_level,
-                'estimated_duration': exercise.estimated_duration,
-                'clinical_focus_areas': exercise.clinical_focus_areas,
-                'description': exercise.description
-            })
+        rows = db.session.execute(select(
+            Exercise.id, Exercise.type, Exercise.name, Exercise.difficulty_level,
+            Exercise.estimated_duration, Exercise.clinical_focus_areas, Exercise.description
+        )).mappings()
+        exercise_data = [dict(row) for row in rows]
         
         return jsonify({'exercises': exercise_data})
     except Exception as e:
@@ -155,55 +290,14 @@ def api_available_exercises():
         return jsonify({'error': 'Failed to get exercises'}), 500
 
 @provider_feedback_bp.route('/api/export_rl_training_data')
-@login_required
+@provider_required
 def api_export_training_data():
     """API endpoint to export RL training data"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
     try:
-        training_data = provider_exercise_feedback.get_rl_training_data(current_user.id)
+        samples = provider_exercise_feedback.iter_rl_training_data(current_user.id)
         
-        # Create CSV export
-        import csv
-        import io
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow([
-            'patient_id', 'provider_id', 'timestamp', 'exercise_type', 'action',
-            'feedback_category', 'clinical_rationale', 'reward_signal',
-            'severity_level', 'phq9_score', 'q9_risk', 'mood_trend', 'engagement_score'
-        ])
-        
-        # Write data
-        for sample in training_data.get('training_data', []):
-            patient_context = sample.get('patient_context', {})
-            assessment_data = patient_context.get('assessment_data', {})
-            
-            writer.writerow([
-                sample.get('patient_id'),
-                sample.get('provider_id'),
-                sample.get('timestamp'),
-                sample.get('recommended_exercise'),
-                sample.get('provider_action'),
-                sample.get('feedback_category'),
-                sample.get('clinical_rationale'),
-                sample.get('reward_signal'),
-                assessment_data.get('severity_level'),
-                assessment_data.get('total_score'),
-                assessment_data.get('q9_risk'),
-                ','.join(map(str, patient_context.get('mood_trend', []))),
-                ','.join(map(str, [ex.get('engagement_score', 0) for ex in patient_context.get('exercise_history', [])]))
-            ])
-        
-        output.seek(0)
-        
-        from flask import Response
         return Response(
-            output.getvalue(),
+            stream_with_context(_generate_training_csv(samples)),
             mimetype='text/csv',
             headers={'Content-Disposition': 'attachment; filename=rl_training_data.csv'}
         )
@@ -212,14 +306,18 @@ def api_export_training_data():
         return jsonify({'error': 'Failed to export training data'}), 500
 
 @provider_feedback_bp.route('/api/rl_training_data')
-@login_required
+@provider_required
 def api_rl_training_data():
-    """API endpoint to get RL training data"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
+    """API endpoint to get RL training data (?format=ndjson streams one sample per line)"""
     try:
         limit = request.args.get('limit', 1000, type=int)
+        
+        if request.args.get('format') == 'ndjson':
+            lines = provider_exercise_feedback.get_rl_training_data(current_user.id, limit, as_stream=True)
+            if isinstance(lines, dict):
+                return jsonify(lines), 500
+            return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+        
         training_data = provider_exercise_feedback.get_rl_training_data(current_user.id, limit)
         return jsonify(training_data)
     except Exception as e:
@@ -227,12 +325,11 @@ def api_rl_training_data():
         return jsonify({'error': 'Failed to get training data'}), 500
 
 @provider_feedback_bp.route('/api/feedback_analytics')
-@login_required
+@provider_required
+@etag_per_provider(60)
+@cached_per_user(60, ANALYTICS_CACHE_KEY)
 def api_feedback_analytics():
     """API endpoint to get feedback analytics"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
     try:
         dashboard_data = provider_exercise_feedback.get_provider_dashboard(current_user.id)
         return jsonify(dashboard_data.get('feedback_analytics', {}))
@@ -241,30 +338,38 @@ def api_feedback_analytics():
         return jsonify({'error': 'Failed to get analytics'}), 500
 
 @provider_feedback_bp.route('/api/patient_feedback_history/<int:patient_id>')
-@login_required
+@provider_required
 def api_patient_feedback_history(patient_id):
     """API endpoint to get patient feedback history"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
     try:
-        from provider_exercise_feedback_system import ProviderExerciseFeedback
+        models = current_app.extensions['feedback_models']
+        db = models['db']
+        ProviderExerciseFeedback = models['ProviderExerciseFeedback']
         
-        feedback_history = ProviderExerciseFeedback.query.filter_by(
-            patient_id=patient_id, provider_id=current_user.id
-        ).order_by(ProviderExerciseFeedback.submitted_at.desc()).all()
+        rows = db.session.execute(
+            select(
+                ProviderExerciseFeedback.id,
+                ProviderExerciseFeedback.exercise_type,
+                ProviderExerciseFeedback.action,
+                ProviderExerciseFeedback.feedback_category,
+                ProviderExerciseFeedback.clinical_rationale,
+                ProviderExerciseFeedback.submitted_at,
+                ProviderExerciseFeedback.modified_recommendations
+            ).where(
+                ProviderExerciseFeedback.patient_id == patient_id,
+                ProviderExerciseFeedback.provider_id == current_user.id
+            ).order_by(ProviderExerciseFeedback.submitted_at.desc())
+        ).mappings()
         
-        history_data = []
-        for feedback in feedback_history:
-            history_data.append({
-                'id': feedback.id,
-                'exercise_type': feedback.exercise_type,
-                'action': feedback.action,
-                'feedback_category': feedback.feedback_category,
-                'clinical_rationale': feedback.clinical_rationale,
-                'submitted_at': feedback.submitted_at.isoformat(),
-                'modified_recommendations': json.loads(feedback.modified_recommendations) if feedback.modified_recommendations else {}
-            })
+        history_data = [{
+            'id': row['id'],
+            'exercise_type': row['exercise_type'],
+            'action': row['action'],
+            'feedback_category': row['feedback_category'],
+            'clinical_rationale': row['clinical_rationale'],
+            'submitted_at': row['submitted_at'].isoformat(),
+            'modified_recommendations': row['modified_recommendations'] or {}
+        } for row in rows]
         
         return jsonify({'feedback_history': history_data})
     except Exception as e:
@@ -272,12 +377,9 @@ def api_patient_feedback_history(patient_id):
         return jsonify({'error': 'Failed to get feedback history'}), 500
 
 @provider_feedback_bp.route('/api/bulk_feedback', methods=['POST'])
-@login_required
+@provider_required
 def api_bulk_feedback():
     """API endpoint for bulk feedback operations"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
     try:
         data = request.get_json()
         patient_id = data.get('patient_id')
@@ -295,52 +397,37 @@ def api_bulk_feedback():
         if 'error' in recommendations:
             return jsonify({'error': recommendations['error']}), 500
         
-        # Process bulk action
-        results = []
+        # Process bulk action for daily and weekly exercises; failures are reported per item
         severity_recs = recommendations.get('recommendations', {}).get('severity_based_recommendations', {})
+        recommendation_id = recommendations.get('recommendations', {}).get('recommendation_id')
+        feedback_items = [{
+            'exercise_type': exercise,
+            'action': action,
+            'category': feedback_data.get('category', 'clinical_appropriateness'),
+            'clinical_rationale': feedback_data.get('rationale', f'Bulk {action} action'),
+            'recommendation_id': recommendation_id
+        } for exercise in severity_recs.get('daily', []) + severity_recs.get('weekly', [])]
         
-        # Process daily exercises
-        for exercise in severity_recs.get('daily', []):
-            result = provider_exercise_feedback.submit_provider_feedback(
-                patient_id, current_user.id, {
-                    'exercise_type': exercise,
-                    'action': action,
-                    'category': feedback_data.get('category', 'clinical_appropriateness'),
-                    'clinical_rationale': feedback_data.get('rationale', f'Bulk {action} action'),
-                    'recommendation_id': recommendations.get('recommendations', {}).get('recommendation_id')
-                }
-            )
-            results.append(result)
+        bulk = provider_exercise_feedback.submit_provider_feedback_bulk(patient_id, current_user.id, feedback_items)
+        if 'error' in bulk:
+            return jsonify({'error': bulk['error']}), 400 if 'invalid_indices' in bulk else 500
         
-        # Process weekly exercises
-        for exercise in severity_recs.get('weekly', []):
-            result = provider_exercise_feedback.submit_provider_feedback(
-                patient_id, current_user.id, {
-                    'exercise_type': exercise,
-                    'action': action,
-                    'category': feedback_data.get('category', 'clinical_appropriateness'),
-                    'clinical_rationale': feedback_data.get('rationale', f'Bulk {action} action'),
-                    'recommendation_id': recommendations.get('recommendations', {}).get('recommendation_id')
-                }
-            )
-            results.append(result)
+        invalidate_provider_cache(current_user.id)
         
         return jsonify({
             'success': True,
-            'processed_count': len(results),
-            'results': results
+            'processed_count': bulk['submitted_count'],
+            'results': bulk['results']
         })
     except Exception as e:
         logger.error(f"Error processing bulk feedback: {str(e)}")
         return jsonify({'error': 'Failed to process bulk feedback'}), 500
 
 @provider_feedback_bp.route('/api/rl_model_status')
-@login_required
+@provider_required
+@cached_per_user(300, 'rl_model_status_{}')
 def api_rl_model_status():
     """API endpoint to get RL model training status"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
     try:
         # This would integrate with your RL model training system
         # For now, return mock data
@@ -363,12 +450,9 @@ def api_rl_model_status():
         return jsonify({'error': 'Failed to get model status'}), 500
 
 @provider_feedback_bp.route('/api/start_rl_training', methods=['POST'])
-@login_required
+@provider_required
 def api_start_rl_training():
     """API endpoint to start RL model training"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
     try:
         # This would start the RL model training process
         # Implementation depends on your RL training system
@@ -383,12 +467,9 @@ def api_start_rl_training():
         return jsonify({'error': 'Failed to start training'}), 500
 
 @provider_feedback_bp.route('/api/rl_predictions/<int:patient_id>')
-@login_required
+@provider_required
 def api_rl_predictions(patient_id):
     """API endpoint to get RL model predictions for a patient"""
-    if current_user.role != 'provider':
-        return jsonify({'error': 'Access denied'}), 403
-    
     try:
         # This would get predictions from your trained RL model
         # For now, return mock data
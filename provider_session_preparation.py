@@ -4,25 +4,270 @@ Provider Session Preparation System
 Generates pre-session intelligence briefs and session-specific talking points
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, has_app_context, jsonify, request
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
 import json
 import numpy as np
-from sqlalchemy import func, and_, desc, extract
-from collections import defaultdict
+from sqlalchemy import String, event, func, and_, case, cast, desc, extract, literal, null, select, union_all
+from sqlalchemy.orm import load_only, object_session
+from functools import wraps
+from operator import attrgetter
+from bisect import bisect_left
+from collections import Counter, defaultdict
 import pandas as pd
 from typing import Dict, List, Any, Optional
 import logging
 
 # Import database models
 from app_ml_complete import (
-    db, Patient, PHQ9Assessment, ExerciseSession, MoodEntry, 
+    db, Patient, PHQ9Assessment, Exercise, ExerciseSession, MoodEntry, 
     CrisisAlert, MindfulnessSession, MicroAssessment, ThoughtRecord
 )
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when Numba is not installed"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+try:
+    from flask_caching import Cache
+    cache = Cache()
+    CACHE_AVAILABLE = True
+except ImportError:
+    cache = None
+    CACHE_AVAILABLE = False
+
 session_preparation = Blueprint('session_preparation', __name__)
 
+# Generated sections are cached per patient; writes to their source rows drop the entries.
+# Each section maps to its (cache key template, timeout in seconds)
+SESSION_CACHE = {
+    'brief': ('session_brief_{}', 60),
+    'talking_points': ('session_talking_points_{}', 300),
+    'session_plan': ('session_plan_{}', 300)
+}
+
+# Patient columns a pre-session brief reads, fetched as plain rows
+BRIEF_PATIENT_COLUMNS = (Patient.id, Patient.first_name, Patient.last_name, Patient.current_phq9_severity)
+
+# Column readers for per-row loops
+_intensity_level = attrgetter('intensity_level')
+_exercise_type = attrgetter('type')
+
+# Day names indexed by SQL extract('dow'), which counts from Sunday = 0
+WEEKDAY_NAMES = ('Sunday', 'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday')
+
+# Time-of-day slots as (name, first hour), shared by the SQL bucket and the hourly histograms
+TIME_OF_DAY_SLOTS = (('morning', 0), ('afternoon', 12), ('evening', 17))
+
+def _time_of_day(column):
+    """SQL bucket of a timestamp column into TIME_OF_DAY_SLOTS"""
+    hour = extract('hour', column)
+    names = [name for name, _ in TIME_OF_DAY_SLOTS]
+    ends = [start for _, start in TIME_OF_DAY_SLOTS[1:]]
+    return case(*((hour < end, name) for name, end in zip(names, ends)), else_=names[-1])
+
+def _ranked_ratings(condition):
+    """Effectiveness ratings numbered from both ends of the id order (first/last three trend)"""
+    return select(
+        ExerciseSession.effectiveness_rating.label('rating'),
+        func.row_number().over(order_by=ExerciseSession.id).label('from_first'),
+        func.row_number().over(order_by=ExerciseSession.id.desc()).label('from_last')
+    ).where(condition).cte('ranked_ratings')
+
+def _time_of_day_counts(hour_counts: np.ndarray) -> Dict[str, int]:
+    """Non-empty TIME_OF_DAY_SLOTS totals from 24 hourly counts"""
+    slot_counts = np.add.reduceat(hour_counts, [start for _, start in TIME_OF_DAY_SLOTS])
+    return {slot: int(count) for (slot, _), count in zip(TIME_OF_DAY_SLOTS, slot_counts) if count}
+
+@njit(cache=True)
+def _pearson(x: np.ndarray, y: np.ndarray) -> float:
+    """Pearson correlation from single-pass (Welford) co-moments; NaN when either series is constant"""
+    mean_x = 0.0
+    mean_y = 0.0
+    m2_x = 0.0
+    m2_y = 0.0
+    co_xy = 0.0
+    for i in range(x.shape[0]):
+        n = i + 1
+        dx = x[i] - mean_x
+        mean_x += dx / n
+        dy = y[i] - mean_y
+        mean_y += dy / n
+        m2_x += dx * (x[i] - mean_x)
+        m2_y += dy * (y[i] - mean_y)
+        co_xy += dx * (y[i] - mean_y)
+    if m2_x == 0.0 or m2_y == 0.0:
+        return np.nan
+    return co_xy / np.sqrt(m2_x * m2_y)
+
+def _mood_trend_averages(mood_levels):
+    """(earlier, recent) means of the first and last three mood intensities, or None with fewer than three"""
+    if len(mood_levels) < 3:
+        return None
+    return mood_levels[:3].mean(), mood_levels[-3:].mean()
+
+def _classify_trend(averages):
+    """'improving'/'declining' when the recent mean moves more than a point from the earlier one"""
+    if averages is None:
+        return 'stable'
+    earlier_avg, recent_avg = averages
+    if recent_avg > earlier_avg + 1:
+        return 'improving'
+    if recent_avg < earlier_avg - 1:
+        return 'declining'
+    return 'stable'
+
+def _exercise_totals(sessions) -> Dict[str, int]:
+    """Session, completion, abandonment and effectiveness-rating tallies from one pass"""
+    completed = abandoned = rated = rating_total = 0
+    for session in sessions:
+        completed += session.completion_status == 'completed'
+        abandoned += session.completion_status == 'abandoned'
+        rating = session.effectiveness_rating
+        if rating is not None:
+            rated += 1
+            rating_total += rating
+    return {
+        'total': len(sessions),
+        'completed': completed,
+        'abandoned': abandoned,
+        'rated': rated,
+        'rating_total': rating_total
+    }
+
+def _since(rows: List, column: str, cutoff: datetime) -> List:
+    """Tail of time-ordered rows whose `column` is at or after cutoff"""
+    return rows[bisect_left(rows, cutoff, key=attrgetter(column)):]
+
+def _partition_exercises(sessions):
+    """Split session rows into (completed, abandoned) lists in one pass; other statuses are skipped"""
+    completed, abandoned = [], []
+    for session in sessions:
+        if session.completion_status == 'completed':
+            completed.append(session)
+        elif session.completion_status == 'abandoned':
+            abandoned.append(session)
+    return completed, abandoned
+
+def _bucket_means(totals):
+    """Mean per bucket from a {key: [sum, count]} accumulator"""
+    return {key: np.float64(total) / count for key, (total, count) in totals.items()}
+
+def _daily_mood_means(mood_rows):
+    """{day ordinal: mean intensity} from rows with timestamp and intensity_level"""
+    if not mood_rows:
+        return {}
+    days = np.fromiter((row.timestamp.toordinal() for row in mood_rows), dtype=np.int64, count=len(mood_rows))
+    levels = np.fromiter(map(_intensity_level, mood_rows), dtype=np.float64, count=len(mood_rows))
+    first = days.min()
+    sums = np.bincount(days - first, weights=levels)
+    counts = np.bincount(days - first)
+    present = np.flatnonzero(counts)
+    return dict(zip((present + first).tolist(), sums[present] / counts[present]))
+
+def _daily_completed_counts(sessions):
+    """{day ordinal: completed sessions} from rows with start_time and completion_status"""
+    days = np.fromiter((session.start_time.toordinal() for session in sessions
+                        if session.completion_status == 'completed'), dtype=np.int64)
+    if not days.size:
+        return {}
+    first = days.min()
+    counts = np.bincount(days - first)
+    present = np.flatnonzero(counts)
+    return dict(zip((present + first).tolist(), counts[present].tolist()))
+
+def _without_autoflush(method):
+    """Run a read-only generator without autoflushing the session before each query"""
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        with db.session.no_autoflush:
+            return method(*args, **kwargs)
+    return wrapper
+
+@session_preparation.record_once
+def init_cache(state):
+    """Bind the session cache to the app (in-memory SimpleCache unless CACHE_TYPE is configured, e.g. RedisCache)"""
+    if CACHE_AVAILABLE:
+        # Default on this cache instance only, so app.config is left to the app
+        cache.init_app(state.app, config={'CACHE_TYPE': state.app.config.get('CACHE_TYPE', 'SimpleCache')})
+
+def _session_cache_ready() -> bool:
+    """True when the session cache is bound to the current app"""
+    return CACHE_AVAILABLE and has_app_context() and cache in current_app.extensions.get('cache', {})
+
+def _load_cached(section: str, patient_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Cached results of a SESSION_CACHE section for the given patients; cache failures count as misses"""
+    if not _session_cache_ready():
+        return {}
+    key = SESSION_CACHE[section][0]
+    try:
+        results = cache.get_many(*(key.format(pid) for pid in patient_ids))
+    except Exception as e:
+        logging.warning(f"Error reading cached {section}: {str(e)}")
+        return {}
+    return {pid: result for pid, result in zip(patient_ids, results) if result is not None}
+
+def _store_cached(section: str, results: Dict[int, Dict[str, Any]]) -> None:
+    """Cache successfully generated results of a SESSION_CACHE section"""
+    if not _session_cache_ready():
+        return
+    key, timeout = SESSION_CACHE[section]
+    try:
+        cache.set_many({key.format(pid): result for pid, result in results.items() if 'error' not in result},
+                       timeout=timeout)
+    except Exception as e:
+        logging.warning(f"Error caching {section}: {str(e)}")
+
+def invalidate_session_cache(*patient_ids: int) -> None:
+    """Drop every cached section for the given patients after their data changes"""
+    if not patient_ids or not _session_cache_ready():
+        return
+    try:
+        cache.delete_many(*(key.format(pid) for key, _ in SESSION_CACHE.values() for pid in patient_ids))
+    except Exception as e:
+        logging.warning(f"Error invalidating session preparation cache: {str(e)}")
+
+# Patients whose cached sections are dropped once the flushing transaction commits
+PENDING_INVALIDATION_KEY = 'session_preparation_stale_patients'
+
+def _mark_stale(target, patient_id) -> None:
+    session = object_session(target)
+    if session is not None and patient_id is not None:
+        session.info.setdefault(PENDING_INVALIDATION_KEY, set()).add(patient_id)
+
+@event.listens_for(Patient, 'after_update')
+def _patient_changed(mapper, connection, target):
+    _mark_stale(target, target.id)
+
+def _patient_activity_changed(mapper, connection, target):
+    _mark_stale(target, target.patient_id)
+
+# Any write to the rows the sections summarise invalidates that patient's cached sections
+for _model in (MoodEntry, ExerciseSession, CrisisAlert, ThoughtRecord):
+    for _event_name in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event_name, _patient_activity_changed)
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_committed(session):
+    patient_ids = session.info.pop(PENDING_INVALIDATION_KEY, None)
+    if patient_ids:
+        invalidate_session_cache(*patient_ids)
+
+@event.listens_for(db.session, 'after_transaction_end')
+def _discard_uncommitted(session, transaction):
+    # Rolled-back writes never reached the cached data
+    if transaction.parent is None:
+        session.info.pop(PENDING_INVALIDATION_KEY, None)
+
 class ProviderSessionPreparationSystem:
     """Provider session preparation system"""
     
@@ -33,151 +278,506 @@ class ProviderSessionPreparationSystem:
             'quarter': 90
         }
     
+    @_without_autoflush
     def generate_pre_session_brief(self, patient_id: int) -> Dict[str, Any]:
         """Generate comprehensive pre-session intelligence brief"""
         try:
-            patient = Patient.query.get(patient_id)
-            if not patient:
-                return {'error': 'Patient not found'}
-            
-            # Get week-at-a-glance data
-            week_overview = self._get_week_at_a_glance(patient_id)
-            
-            # Get key concerns
-            key_concerns = self._identify_key_concerns(patient_id)
+            cached = _load_cached('brief', [patient_id])
+            if cached:
+                return cached[patient_id]
             
-            # Get progress highlights
-            progress_highlights = self._get_progress_highlights(patient_id)
+            # One clock reading per brief; every section shares its window
+            now = datetime.now()
+            week_ago = now - timedelta(days=self.analysis_periods['week'])
             
-            # Get suggested session focus
-            session_focus = self._suggest_session_focus(patient_id)
+            patient = Patient.query.with_entities(*BRIEF_PATIENT_COLUMNS).filter(Patient.id == patient_id).first()
+            if not patient:
+                return {'error': 'Patient not found'}
             
-            # Get treatment plan updates
-            treatment_updates = self._get_treatment_plan_updates(patient_id)
+            # Past week's activity, loaded once and shared by every section
+            week = self._fetch_week_bundles([patient_id], week_ago)[patient_id]
             
-            return {
-                'patient_info': {
-                    'id': patient.id,
-                    'name': f"{patient.first_name} {patient.last_name}",
-                    'current_severity': patient.current_phq9_severity,
-                    'last_session': self._get_last_session_date(patient_id)
-                },
-                'week_at_a_glance': week_overview,
-                'key_concerns': key_concerns,
-                'progress_highlights': progress_highlights,
-                'suggested_session_focus': session_focus,
-                'treatment_plan_updates': treatment_updates,
-                'generated_at': datetime.now().isoformat()
-            }
+            brief = self._build_pre_session_brief(patient, week, now.isoformat(timespec='seconds'))
+            _store_cached('brief', {patient_id: brief})
+            return brief
             
         except Exception as e:
             logging.error(f"Error generating pre-session brief: {str(e)}")
             return {'error': f'Failed to generate pre-session brief: {str(e)}'}
     
+    @_without_autoflush
+    def generate_pre_session_briefs(self, patient_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Generate pre-session briefs for several patients, keyed by patient id
+        
+        Cached briefs are reused; the week's rows for the remaining patients
+        are loaded with one query per table.
+        """
+        patient_ids = list(dict.fromkeys(patient_ids))
+        cached = _load_cached('brief', patient_ids)
+        missing = [pid for pid in patient_ids if pid not in cached]
+        if not missing:
+            return {pid: cached[pid] for pid in patient_ids}
+        
+        try:
+            now = datetime.now()
+            week_ago = now - timedelta(days=self.analysis_periods['week'])
+            
+            patients = {p.id: p for p in Patient.query.with_entities(*BRIEF_PATIENT_COLUMNS).filter(
+                Patient.id.in_(missing)
+            ).all()}
+            weeks = self._fetch_week_bundles(list(patients), week_ago)
+        except Exception as e:
+            logging.error(f"Error generating pre-session briefs: {str(e)}")
+            error = {'error': f'Failed to generate pre-session brief: {str(e)}'}
+            return {pid: cached.get(pid, error) for pid in patient_ids}
+        
+        # Every brief in the batch shares one timestamp string
+        generated_at = now.isoformat(timespec='seconds')
+        generated = {}
+        for pid in missing:
+            patient = patients.get(pid)
+            if not patient:
+                generated[pid] = {'error': 'Patient not found'}
+                continue
+            try:
+                generated[pid] = self._build_pre_session_brief(patient, weeks[pid], generated_at)
+            except Exception as e:
+                logging.error(f"Error generating pre-session brief: {str(e)}")
+                generated[pid] = {'error': f'Failed to generate pre-session brief: {str(e)}'}
+        _store_cached('brief', generated)
+        
+        return {pid: cached[pid] if pid in cached else generated[pid] for pid in patient_ids}
+    
+    def _build_pre_session_brief(self, patient, week: Dict[str, Any], generated_at: str) -> Dict[str, Any]:
+        """Assemble a pre-session brief from a patient row (BRIEF_PATIENT_COLUMNS) and week bundle"""
+        # Get week-at-a-glance data
+        week_overview = self._get_week_at_a_glance(week)
+        
+        # Get key concerns
+        key_concerns = self._identify_key_concerns(week)
+        
+        # Get progress highlights
+        progress_highlights = self._get_progress_highlights(week)
+        
+        # Get suggested session focus
+        session_focus = self._suggest_session_focus(key_concerns)
+        
+        # Get treatment plan updates
+        treatment_updates = self._get_treatment_plan_updates(week)
+        
+        return {
+            'patient_info': {
+                'id': patient.id,
+                'name': f"{patient.first_name} {patient.last_name}",
+                'current_severity': patient.current_phq9_severity,
+                'last_session': self._get_last_session_date(patient.id)
+            },
+            'week_at_a_glance': week_overview,
+            'key_concerns': key_concerns,
+            'progress_highlights': progress_highlights,
+            'suggested_session_focus': session_focus,
+            'treatment_plan_updates': treatment_updates,
+            'generated_at': generated_at
+        }
+    
+    @_without_autoflush
     def generate_session_talking_points(self, patient_id: int) -> Dict[str, Any]:
         """Generate session-specific talking points"""
         try:
+            cached = _load_cached('talking_points', [patient_id])
+            if cached:
+                return cached[patient_id]
+            
+            now = datetime.now()
+            week_ago = now - timedelta(days=self.analysis_periods['week'])
+            month_ago = now - timedelta(days=self.analysis_periods['month'])
+            
             # Analyze recent patterns
-            mood_patterns = self._analyze_mood_patterns_for_talking_points(patient_id)
-            exercise_patterns = self._analyze_exercise_patterns_for_talking_points(patient_id)
-            cbt_patterns = self._analyze_cbt_patterns_for_talking_points(patient_id)
-            crisis_patterns = self._analyze_crisis_patterns_for_talking_points(patient_id)
+            mood_patterns = self._analyze_mood_patterns_for_talking_points(patient_id, week_ago)
+            exercise_patterns = self._analyze_exercise_patterns_for_talking_points(patient_id, week_ago)
+            cbt_patterns = self._analyze_cbt_patterns_for_talking_points(patient_id, month_ago)
+            crisis_patterns = self._analyze_crisis_patterns_for_talking_points(patient_id, month_ago)
             
-            # Generate talking points
-            talking_points = self._generate_talking_points(
-                patient_id, mood_patterns, exercise_patterns, cbt_patterns, crisis_patterns
+            talking_points = self._build_talking_points_response(
+                patient_id, mood_patterns, exercise_patterns, cbt_patterns, crisis_patterns,
+                now.isoformat(timespec='seconds')
             )
-            
-            return {
-                'mood_focused_points': talking_points['mood'],
-                'exercise_focused_points': talking_points['exercise'],
-                'cbt_focused_points': talking_points['cbt'],
-                'crisis_focused_points': talking_points['crisis'],
-                'general_points': talking_points['general'],
-                'evidence_basis': talking_points['evidence'],
-                'generated_at': datetime.now().isoformat()
-            }
+            _store_cached('talking_points', {patient_id: talking_points})
+            return talking_points
             
         except Exception as e:
             logging.error(f"Error generating talking points: {str(e)}")
             return {'error': f'Failed to generate talking points: {str(e)}'}
     
+    @_without_autoflush
     def generate_evidence_based_session_plan(self, patient_id: int) -> Dict[str, Any]:
         """Generate evidence-based session planning"""
         try:
+            cached = _load_cached('session_plan', [patient_id])
+            if cached:
+                return cached[patient_id]
+            
+            now = datetime.now()
+            month_ago = now - timedelta(days=self.analysis_periods['month'])
+            
+            # Grouped month aggregates for every section, in one round trip
+            aggregates = self._fetch_month_aggregates(patient_id, month_ago)
+            
             # Get correlation data
-            correlations = self._get_correlation_data(patient_id)
+            correlations = self._get_correlation_data(
+                patient_id, month_ago, aggregates['daily_mood'], aggregates['daily_exercise']
+            )
             
             # Get pattern recognition
-            patterns = self._get_pattern_recognition(patient_id)
+            patterns = self._get_pattern_recognition(
+                patient_id, month_ago, aggregates['crisis_hours'], aggregates['slot_effectiveness']
+            )
             
             # Get skill development metrics
-            skill_development = self._get_skill_development_metrics(patient_id)
+            skill_development = self._get_skill_development_metrics(patient_id, month_ago)
             
             # Get treatment response data
-            treatment_response = self._get_treatment_response_data(patient_id)
+            treatment_response = self._get_treatment_response_data(
+                patient_id, month_ago, aggregates['type_stats'], aggregates['rating_ends']
+            )
             
-            return {
-                'correlation_data': correlations,
-                'pattern_recognition': patterns,
-                'skill_development': skill_development,
-                'treatment_response': treatment_response,
-                'session_planning_insights': self._generate_session_planning_insights(
-                    patient_id, correlations, patterns, skill_development, treatment_response
-                ),
-                'generated_at': datetime.now().isoformat()
-            }
+            session_plan = self._build_session_plan(
+                patient_id, correlations, patterns, skill_development, treatment_response,
+                now.isoformat(timespec='seconds')
+            )
+            _store_cached('session_plan', {patient_id: session_plan})
+            return session_plan
             
         except Exception as e:
             logging.error(f"Error generating evidence-based session plan: {str(e)}")
             return {'error': f'Failed to generate session plan: {str(e)}'}
     
-    def _get_week_at_a_glance(self, patient_id: int) -> Dict[str, Any]:
-        """Get week-at-a-glance summary"""
-        week_ago = datetime.now() - timedelta(days=7)
+    @_without_autoflush
+    def generate_session_package(self, patient_id: int) -> Dict[str, Any]:
+        """Generate the pre-session brief, talking points and session plan together
+        
+        The month's mood, exercise and thought record rows are loaded once;
+        the week-window sections read the tail of those (time-ordered) lists.
+        Cached sections are reused, and each section reports its own error
+        like the standalone generators.
+        """
+        now = datetime.now()
+        generated_at = now.isoformat(timespec='seconds')
+        week_ago = now - timedelta(days=self.analysis_periods['week'])
+        month_ago = now - timedelta(days=self.analysis_periods['month'])
+        
+        brief = _load_cached('brief', [patient_id]).get(patient_id)
+        talking_points = _load_cached('talking_points', [patient_id]).get(patient_id)
+        session_plan = _load_cached('session_plan', [patient_id]).get(patient_id)
+        if brief is not None and talking_points is not None and session_plan is not None:
+            return {
+                'pre_session_brief': brief,
+                'session_talking_points': talking_points,
+                'evidence_based_session_plan': session_plan,
+                'generated_at': generated_at
+            }
+        
+        try:
+            month = self._fetch_month_rows(patient_id, month_ago)
+        except Exception as e:
+            logging.error(f"Error generating session package: {str(e)}")
+            return {
+                'pre_session_brief': brief or {'error': f'Failed to generate pre-session brief: {str(e)}'},
+                'session_talking_points': talking_points or {'error': f'Failed to generate talking points: {str(e)}'},
+                'evidence_based_session_plan': session_plan or {'error': f'Failed to generate session plan: {str(e)}'},
+                'generated_at': generated_at
+            }
+        
+        week_moods = _since(month['mood_entries'], 'timestamp', week_ago)
+        week_sessions = _since(month['exercise_sessions'], 'start_time', week_ago)
+        
+        if brief is None:
+            try:
+                patient = Patient.query.with_entities(*BRIEF_PATIENT_COLUMNS).filter(Patient.id == patient_id).first()
+                if not patient:
+                    brief = {'error': 'Patient not found'}
+                else:
+                    crisis_alerts = CrisisAlert.query.with_entities(CrisisAlert.id).filter(
+                        and_(
+                            CrisisAlert.patient_id == patient_id,
+                            CrisisAlert.created_at >= week_ago
+                        )
+                    ).all()
+                    week = self._build_week_bundle(week_moods, week_sessions, crisis_alerts)
+                    brief = self._build_pre_session_brief(patient, week, generated_at)
+                    _store_cached('brief', {patient_id: brief})
+            except Exception as e:
+                logging.error(f"Error generating pre-session brief: {str(e)}")
+                brief = {'error': f'Failed to generate pre-session brief: {str(e)}'}
+        
+        aggregates = {}
+        if talking_points is None or session_plan is None:
+            try:
+                # Daily maps come from the loaded rows; the hourly crisis counts serve both sections
+                aggregates = self._fetch_month_aggregates(patient_id, month_ago, include_daily=False)
+            except Exception as e:
+                logging.error(f"Error loading month aggregates: {str(e)}")
+        
+        if talking_points is None:
+            try:
+                talking_points = self._build_talking_points_response(
+                    patient_id,
+                    self._analyze_mood_patterns_for_talking_points(patient_id, week_ago, week_moods),
+                    self._analyze_exercise_patterns_for_talking_points(patient_id, week_ago, week_sessions),
+                    self._analyze_cbt_patterns_for_talking_points(patient_id, month_ago, month['thought_records']),
+                    self._analyze_crisis_patterns_for_talking_points(patient_id, month_ago,
+                                                                     aggregates.get('crisis_hours')),
+                    generated_at
+                )
+                _store_cached('talking_points', {patient_id: talking_points})
+            except Exception as e:
+                logging.error(f"Error generating talking points: {str(e)}")
+                talking_points = {'error': f'Failed to generate talking points: {str(e)}'}
+        
+        if session_plan is None:
+            try:
+                session_plan = self._build_session_plan(
+                    patient_id,
+                    self._get_correlation_data(patient_id, month_ago,
+                                               _daily_mood_means(month['mood_entries']),
+                                               _daily_completed_counts(month['exercise_sessions'])),
+                    self._get_pattern_recognition(patient_id, month_ago, aggregates.get('crisis_hours'),
+                                                  aggregates.get('slot_effectiveness')),
+                    self._get_skill_development_metrics(patient_id, month_ago, month['thought_records']),
+                    self._get_treatment_response_data(patient_id, month_ago, aggregates.get('type_stats'),
+                                                      aggregates.get('rating_ends')),
+                    generated_at
+                )
+                _store_cached('session_plan', {patient_id: session_plan})
+            except Exception as e:
+                logging.error(f"Error generating evidence-based session plan: {str(e)}")
+                session_plan = {'error': f'Failed to generate session plan: {str(e)}'}
+        
+        return {
+            'pre_session_brief': brief,
+            'session_talking_points': talking_points,
+            'evidence_based_session_plan': session_plan,
+            'generated_at': generated_at
+        }
+    
+    def _fetch_month_rows(self, patient_id: int, month_ago: datetime) -> Dict[str, List]:
+        """Load a patient's month of mood, exercise and thought record rows, each in time order
+        
+        Rows carry every column the brief, talking point and correlation
+        helpers read, so the week windows can be sliced from them.
+        """
+        return {
+            'mood_entries': MoodEntry.query.with_entities(
+                MoodEntry.timestamp,
+                extract('dow', MoodEntry.timestamp).label('dow'),
+                _time_of_day(MoodEntry.timestamp).label('time_slot'),
+                MoodEntry.intensity_level, MoodEntry.social_context
+            ).filter(
+                and_(
+                    MoodEntry.patient_id == patient_id,
+                    MoodEntry.timestamp >= month_ago
+                )
+            ).order_by(MoodEntry.timestamp).all(),
+            'exercise_sessions': ExerciseSession.query.with_entities(
+                ExerciseSession.start_time, ExerciseSession.completion_status,
+                ExerciseSession.effectiveness_rating, Exercise.type
+            ).outerjoin(Exercise, ExerciseSession.exercise_id == Exercise.id).filter(
+                and_(
+                    ExerciseSession.patient_id == patient_id,
+                    ExerciseSession.start_time >= month_ago
+                )
+            ).order_by(ExerciseSession.start_time).all(),
+            'thought_records': ThoughtRecord.query.options(load_only(ThoughtRecord.created_at)).filter(
+                and_(
+                    ThoughtRecord.patient_id == patient_id,
+                    ThoughtRecord.created_at >= month_ago
+                )
+            ).order_by(ThoughtRecord.created_at).all()
+        }
+    
+    def _fetch_month_aggregates(self, patient_id: int, month_ago: datetime,
+                                include_daily: bool = True) -> Dict[str, Any]:
+        """Grouped month-window aggregates behind the session plan, in one UNION ALL round trip
+        
+        Every branch yields (section, key, total, count, first_id) rows: daily mood
+        and completed-session totals (unless include_daily is False), crisis alerts
+        per hour, rated completed sessions per time of day, ratings per exercise type
+        and the first and last three ratings.
+        """
+        def branch(section, key, total, count, first_id=null()):
+            return select(literal(section).label('section'), cast(key, String).label('key'),
+                          total.label('total'), count.label('count'), first_id.label('first_id'))
+        
+        in_month = and_(ExerciseSession.patient_id == patient_id, ExerciseSession.start_time >= month_ago)
+        rated = ExerciseSession.effectiveness_rating.isnot(None)
+        branches = []
+        if include_daily:
+            mood_day = func.date(MoodEntry.timestamp)
+            session_day = func.date(ExerciseSession.start_time)
+            branches += [
+                branch('daily_mood', mood_day, func.sum(MoodEntry.intensity_level), func.count(MoodEntry.id)).where(
+                    MoodEntry.patient_id == patient_id, MoodEntry.timestamp >= month_ago
+                ).group_by(mood_day),
+                branch('daily_exercise', session_day, null(), func.count(ExerciseSession.id)).where(
+                    in_month, ExerciseSession.completion_status == 'completed'
+                ).group_by(session_day)
+            ]
+        crisis_hour = extract('hour', CrisisAlert.created_at)
+        time_slot = _time_of_day(ExerciseSession.start_time)
+        ranked = _ranked_ratings(and_(in_month, rated))
+        branches += [
+            branch('crisis_hours', crisis_hour, null(), func.count(CrisisAlert.id)).where(
+                CrisisAlert.patient_id == patient_id, CrisisAlert.created_at >= month_ago
+            ).group_by(crisis_hour),
+            branch('slot_effectiveness', time_slot, func.sum(ExerciseSession.effectiveness_rating),
+                   func.count(ExerciseSession.effectiveness_rating)).where(
+                in_month, ExerciseSession.completion_status == 'completed', rated
+            ).group_by(time_slot),
+            # MIN(id) keeps the first-recorded order for ranking ties
+            branch('type_stats', Exercise.type, func.sum(ExerciseSession.effectiveness_rating),
+                   func.count(ExerciseSession.effectiveness_rating), func.min(ExerciseSession.id)).select_from(
+                ExerciseSession
+            ).outerjoin(Exercise, ExerciseSession.exercise_id == Exercise.id).where(in_month, rated).group_by(Exercise.type),
+            # First and last three ratings by id, for the effectiveness trend
+            branch('rating_ends', literal('earlier'), func.sum(case((ranked.c.from_first <= 3, ranked.c.rating))),
+                   func.count(case((ranked.c.from_first <= 3, ranked.c.rating)))),
+            branch('rating_ends', literal('recent'), func.sum(case((ranked.c.from_last <= 3, ranked.c.rating))),
+                   func.count(case((ranked.c.from_last <= 3, ranked.c.rating))))
+        ]
+        
+        aggregates = {
+            'daily_mood': {},
+            'daily_exercise': {},
+            'crisis_hours': np.zeros(24, dtype=np.int64),
+            'slot_effectiveness': {},
+            'type_stats': [],
+            'rating_ends': {}
+        }
+        for section, key, total, count, first_id in db.session.execute(union_all(*branches)):
+            if section == 'daily_mood':
+                aggregates['daily_mood'][key] = np.float64(total) / count
+            elif section == 'daily_exercise':
+                aggregates['daily_exercise'][key] = count
+            elif section == 'crisis_hours':
+                aggregates['crisis_hours'][int(key)] = count
+            elif section == 'slot_effectiveness':
+                aggregates['slot_effectiveness'][key] = np.float64(total) / count
+            elif section == 'rating_ends':
+                if count:
+                    aggregates['rating_ends'][key] = np.float64(total) / count
+            else:
+                aggregates['type_stats'].append((key, total, count, first_id))
+        
+        if not include_daily:
+            del aggregates['daily_mood'], aggregates['daily_exercise']
+        return aggregates
+    
+    def _build_talking_points_response(self, patient_id: int, mood_patterns: Dict, exercise_patterns: Dict,
+                                       cbt_patterns: Dict, crisis_patterns: Dict, generated_at: str) -> Dict[str, Any]:
+        """Assemble the talking points response from the analysed patterns"""
+        # Generate talking points
+        talking_points = self._generate_talking_points(
+            patient_id, mood_patterns, exercise_patterns, cbt_patterns, crisis_patterns
+        )
         
-        # Get mood trends
-        mood_entries = MoodEntry.query.filter(
+        return {
+            'mood_focused_points': talking_points['mood'],
+            'exercise_focused_points': talking_points['exercise'],
+            'cbt_focused_points': talking_points['cbt'],
+            'crisis_focused_points': talking_points['crisis'],
+            'general_points': talking_points['general'],
+            'evidence_basis': talking_points['evidence'],
+            'generated_at': generated_at
+        }
+    
+    def _build_session_plan(self, patient_id: int, correlations: Dict, patterns: Dict, skill_development: Dict,
+                            treatment_response: Dict, generated_at: str) -> Dict[str, Any]:
+        """Assemble the evidence-based session plan from its sections"""
+        return {
+            'correlation_data': correlations,
+            'pattern_recognition': patterns,
+            'skill_development': skill_development,
+            'treatment_response': treatment_response,
+            'session_planning_insights': self._generate_session_planning_insights(
+                patient_id, correlations, patterns, skill_development, treatment_response
+            ),
+            'generated_at': generated_at
+        }
+    
+    def _fetch_week_bundles(self, patient_ids: List[int], week_ago: datetime) -> Dict[int, Dict[str, Any]]:
+        """Load the past week's mood, exercise, crisis and thought record rows per patient
+        
+        One query per table covers every patient; rows are grouped by patient
+        id afterwards. Each bundle also carries 'mood_levels', the mood
+        intensities as one NumPy array, plus 'mood_averages' and 'mood_trend'
+        computed from it once, and 'exercise_totals' from one pass over the
+        sessions. Only the columns the brief reads are selected; thought
+        records stay full entities.
+        """
+        mood_entries = defaultdict(list)
+        for row in MoodEntry.query.with_entities(MoodEntry.patient_id, MoodEntry.intensity_level).filter(
             and_(
-                MoodEntry.patient_id == patient_id,
+                MoodEntry.patient_id.in_(patient_ids),
                 MoodEntry.timestamp >= week_ago
             )
-        ).order_by(MoodEntry.timestamp).all()
+        ).order_by(MoodEntry.patient_id, MoodEntry.timestamp):
+            mood_entries[row.patient_id].append(row)
         
-        # Get exercise completion
-        exercise_sessions = ExerciseSession.query.filter(
+        exercise_sessions = defaultdict(list)
+        for row in ExerciseSession.query.with_entities(
+            ExerciseSession.patient_id, ExerciseSession.completion_status, ExerciseSession.effectiveness_rating
+        ).filter(
             and_(
-                ExerciseSession.patient_id == patient_id,
+                ExerciseSession.patient_id.in_(patient_ids),
                 ExerciseSession.start_time >= week_ago
             )
-        ).all()
+        ):
+            exercise_sessions[row.patient_id].append(row)
         
-        # Get crisis episodes
-        crisis_alerts = CrisisAlert.query.filter(
+        crisis_alerts = defaultdict(list)
+        for row in CrisisAlert.query.with_entities(CrisisAlert.patient_id, CrisisAlert.id).filter(
             and_(
-                CrisisAlert.patient_id == patient_id,
+                CrisisAlert.patient_id.in_(patient_ids),
                 CrisisAlert.created_at >= week_ago
             )
-        ).all()
-        
-        # Calculate trends
-        mood_trend = 'stable'
-        if len(mood_entries) >= 3:
-            recent_avg = np.mean([entry.intensity_level for entry in mood_entries[-3:]])
-            earlier_avg = np.mean([entry.intensity_level for entry in mood_entries[:3]])
-            if recent_avg > earlier_avg + 1:
-                mood_trend = 'improving'
-            elif recent_avg < earlier_avg - 1:
-                mood_trend = 'declining'
-        
-        exercise_completion = len([s for s in exercise_sessions if s.completion_status == 'completed'])
-        total_exercises = len(exercise_sessions)
+        ):
+            crisis_alerts[row.patient_id].append(row)
+        
+        return {
+            pid: self._build_week_bundle(mood_entries[pid], exercise_sessions[pid], crisis_alerts[pid])
+            for pid in patient_ids
+        }
+    
+    def _build_week_bundle(self, mood_entries: List, exercise_sessions: List,
+                           crisis_alerts: List) -> Dict[str, Any]:
+        """Week bundle from a patient's already-loaded rows (moods in timestamp order)"""
+        # Intensity series (1-10) in timestamp order, shared by the trend/average checks
+        mood_levels = np.fromiter(map(_intensity_level, mood_entries), dtype=np.int8, count=len(mood_entries))
+        mood_averages = _mood_trend_averages(mood_levels)
+        return {
+            'mood_entries': mood_entries,
+            'mood_levels': mood_levels,
+            'mood_averages': mood_averages,
+            'mood_trend': _classify_trend(mood_averages),
+            'exercise_totals': _exercise_totals(exercise_sessions),
+            'crisis_alerts': crisis_alerts
+        }
+    
+    def _get_week_at_a_glance(self, week: Dict[str, Any]) -> Dict[str, Any]:
+        """Get week-at-a-glance summary"""
+        mood_entries = week['mood_entries']
+        mood_levels = week['mood_levels']
+        exercise_totals = week['exercise_totals']
+        crisis_alerts = week['crisis_alerts']
+        
+        exercise_completion = exercise_totals['completed']
+        total_exercises = exercise_totals['total']
         completion_rate = exercise_completion / total_exercises if total_exercises > 0 else 0
         
         return {
-            'mood_trend': mood_trend,
+            'mood_trend': week['mood_trend'],
             'mood_entries_count': len(mood_entries),
-            'avg_mood_level': np.mean([entry.intensity_level for entry in mood_entries]) if mood_entries else None,
+            'avg_mood_level': mood_levels.mean() if mood_entries else None,
             'exercise_completion_rate': round(completion_rate, 3),
             'exercises_completed': exercise_completion,
             'total_exercises_assigned': total_exercises,
@@ -185,22 +785,17 @@ class ProviderSessionPreparationSystem:
             'engagement_level': 'high' if completion_rate >= 0.8 and len(mood_entries) >= 5 else 'low'
         }
     
-    def _identify_key_concerns(self, patient_id: int) -> List[Dict[str, Any]]:
+    def _identify_key_concerns(self, week: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Identify key concerns for the session"""
         concerns = []
-        week_ago = datetime.now() - timedelta(days=7)
+        mood_entries = week['mood_entries']
+        mood_averages = week['mood_averages']
+        exercise_totals = week['exercise_totals']
+        crisis_alerts = week['crisis_alerts']
         
         # Check for declining patterns
-        mood_entries = MoodEntry.query.filter(
-            and_(
-                MoodEntry.patient_id == patient_id,
-                MoodEntry.timestamp >= week_ago
-            )
-        ).order_by(MoodEntry.timestamp).all()
-        
-        if len(mood_entries) >= 3:
-            recent_avg = np.mean([entry.intensity_level for entry in mood_entries[-3:]])
-            earlier_avg = np.mean([entry.intensity_level for entry in mood_entries[:3]])
+        if mood_averages is not None:
+            earlier_avg, recent_avg = mood_averages
             if recent_avg < earlier_avg - 2:
                 concerns.append({
                     'type': 'mood_decline',
@@ -210,30 +805,16 @@ class ProviderSessionPreparationSystem:
                 })
         
         # Check for missed exercises
-        exercise_sessions = ExerciseSession.query.filter(
-            and_(
-                ExerciseSession.patient_id == patient_id,
-                ExerciseSession.start_time >= week_ago
-            )
-        ).all()
-        
-        skipped_exercises = [s for s in exercise_sessions if s.completion_status == 'abandoned']
-        if len(skipped_exercises) >= 3:
+        skipped_exercises = exercise_totals['abandoned']
+        if skipped_exercises >= 3:
             concerns.append({
                 'type': 'exercise_avoidance',
                 'severity': 'moderate',
-                'description': f'Multiple exercises skipped ({len(skipped_exercises)} this week)',
+                'description': f'Multiple exercises skipped ({skipped_exercises} this week)',
                 'priority': 'medium'
             })
         
         # Check for crisis episodes
-        crisis_alerts = CrisisAlert.query.filter(
-            and_(
-                CrisisAlert.patient_id == patient_id,
-                CrisisAlert.created_at >= week_ago
-            )
-        ).all()
-        
         if crisis_alerts:
             concerns.append({
                 'type': 'crisis_episodes',
@@ -243,7 +824,7 @@ class ProviderSessionPreparationSystem:
             })
         
         # Check for low engagement
-        if len(mood_entries) < 3 and len(exercise_sessions) < 2:
+        if len(mood_entries) < 3 and exercise_totals['total'] < 2:
             concerns.append({
                 'type': 'low_engagement',
                 'severity': 'moderate',
@@ -253,73 +834,34 @@ class ProviderSessionPreparationSystem:
         
         return concerns
     
-    def _get_progress_highlights(self, patient_id: int) -> List[Dict[str, Any]]:
+    def _get_progress_highlights(self, week: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Get progress highlights and positive trends"""
         highlights = []
-        week_ago = datetime.now() - timedelta(days=7)
+        crisis_alerts = week['crisis_alerts']
         
         # Check for mood improvements
-        mood_entries = MoodEntry.query.filter(
-            and_(
-                MoodEntry.patient_id == patient_id,
-                MoodEntry.timestamp >= week_ago
-            )
-        ).order_by(MoodEntry.timestamp).all()
-        
-        if len(mood_entries) >= 3:
-            recent_avg = np.mean([entry.intensity_level for entry in mood_entries[-3:]])
-            earlier_avg = np.mean([entry.intensity_level for entry in mood_entries[:3]])
-            if recent_avg > earlier_avg + 1:
-                highlights.append({
-                    'type': 'mood_improvement',
-                    'description': 'Mood showing consistent improvement',
-                    'evidence': f'Average mood increased from {earlier_avg:.1f} to {recent_avg:.1f}',
-                    'significance': 'high'
-                })
+        if week['mood_trend'] == 'improving':
+            earlier_avg, recent_avg = week['mood_averages']
+            highlights.append({
+                'type': 'mood_improvement',
+                'description': 'Mood showing consistent improvement',
+                'evidence': f'Average mood increased from {earlier_avg:.1f} to {recent_avg:.1f}',
+                'significance': 'high'
+            })
         
         # Check for exercise consistency
-        exercise_sessions = ExerciseSession.query.filter(
-            and_(
-                ExerciseSession.patient_id == patient_id,
-                ExerciseSession.start_time >= week_ago
-            )
-        ).all()
-        
-        completed_exercises = [s for s in exercise_sessions if s.completion_status == 'completed']
-        if len(completed_exercises) >= 5:
+        completed_exercises = week['exercise_totals']['completed']
+        if completed_exercises >= 5:
             highlights.append({
                 'type': 'exercise_consistency',
                 'description': 'Strong exercise completion rate',
-                'evidence': f'{len(completed_exercises)} exercises completed this week',
+                'evidence': f'{completed_exercises} exercises completed this week',
                 'significance': 'medium'
             })
         
-        # Check for skill development
-        thought_records = ThoughtRecord.query.filter(
-            and_(
-                ThoughtRecord.patient_id == patient_id,
-                ThoughtRecord.created_at >= week_ago
-            )
-        ).all()
-        
-        if thought_records:
-            avg_insight = np.mean([r.insight_score for r in thought_records if r.insight_score])
-            if avg_insight and avg_insight >= 7:
-                highlights.append({
-                    'type': 'skill_development',
-                    'description': 'Strong cognitive insight development',
-                    'evidence': f'Average insight score of {avg_insight:.1f}/10',
-                    'significance': 'high'
-                })
+        # No skill development highlight: ThoughtRecord has no insight score to average
         
         # Check for crisis reduction
-        crisis_alerts = CrisisAlert.query.filter(
-            and_(
-                CrisisAlert.patient_id == patient_id,
-                CrisisAlert.created_at >= week_ago
-            )
-        ).all()
-        
         if not crisis_alerts:
             highlights.append({
                 'type': 'crisis_reduction',
@@ -330,11 +872,8 @@ class ProviderSessionPreparationSystem:
         
         return highlights
     
-    def _suggest_session_focus(self, patient_id: int) -> Dict[str, Any]:
-        """Suggest session focus based on recent data"""
-        concerns = self._identify_key_concerns(patient_id)
-        highlights = self._get_progress_highlights(patient_id)
-        
+    def _suggest_session_focus(self, concerns: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Suggest session focus based on the brief's key concerns"""
         # Determine primary focus
         primary_focus = 'general_progress'
         if any(c['priority'] == 'critical' for c in concerns):
@@ -377,22 +916,15 @@ class ProviderSessionPreparationSystem:
             'priority_level': 'high' if primary_focus == 'crisis_management' else 'medium'
         }
     
-    def _get_treatment_plan_updates(self, patient_id: int) -> List[Dict[str, Any]]:
+    def _get_treatment_plan_updates(self, week: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Get recommended treatment plan updates"""
         updates = []
-        week_ago = datetime.now() - timedelta(days=7)
         
         # Analyze treatment response
-        exercise_sessions = ExerciseSession.query.filter(
-            and_(
-                ExerciseSession.patient_id == patient_id,
-                ExerciseSession.start_time >= week_ago,
-                ExerciseSession.effectiveness_rating.isnot(None)
-            )
-        ).all()
+        exercise_totals = week['exercise_totals']
         
-        if exercise_sessions:
-            avg_effectiveness = np.mean([s.effectiveness_rating for s in exercise_sessions])
+        if exercise_totals['rated']:
+            avg_effectiveness = np.float64(exercise_totals['rating_total']) / exercise_totals['rated']
             if avg_effectiveness < 6:
                 updates.append({
                     'type': 'exercise_adjustment',
@@ -409,12 +941,7 @@ class ProviderSessionPreparationSystem:
                 })
         
         # Analyze engagement patterns
-        mood_entries = MoodEntry.query.filter(
-            and_(
-                MoodEntry.patient_id == patient_id,
-                MoodEntry.timestamp >= week_ago
-            )
-        ).count()
+        mood_entries = len(week['mood_entries'])
         
         if mood_entries < 3:
             updates.append({
@@ -432,16 +959,26 @@ class ProviderSessionPreparationSystem:
         # For now, return None
         return None
     
-    def _analyze_mood_patterns_for_talking_points(self, patient_id: int) -> Dict[str, Any]:
-        """Analyze mood patterns for talking points"""
-        week_ago = datetime.now() - timedelta(days=7)
-        
-        mood_entries = MoodEntry.query.filter(
-            and_(
-                MoodEntry.patient_id == patient_id,
-                MoodEntry.timestamp >= week_ago
-            )
-        ).order_by(MoodEntry.timestamp).all()
+    def _analyze_mood_patterns_for_talking_points(self, patient_id: int, week_ago: datetime,
+                                                  mood_entries: Optional[List] = None) -> Dict[str, Any]:
+        """Analyze mood patterns for talking points
+        
+        mood_entries may be passed preloaded (timestamp-ordered rows with dow,
+        time_slot, intensity_level and social_context); otherwise they are queried.
+        """
+        if mood_entries is None:
+            # Weekday (0 = Sunday) and time slot are bucketed by the database
+            mood_entries = MoodEntry.query.with_entities(
+                extract('dow', MoodEntry.timestamp).label('dow'),
+                _time_of_day(MoodEntry.timestamp).label('time_slot'),
+                MoodEntry.intensity_level, MoodEntry.social_context
+            ).filter(
+                and_(
+                    MoodEntry.patient_id == patient_id,
+                    MoodEntry.timestamp >= week_ago
+                )
+            ).order_by(MoodEntry.timestamp).all()
+        mood_levels = np.fromiter(map(_intensity_level, mood_entries), dtype=np.int8, count=len(mood_entries))
         
         patterns = {
             'day_patterns': {},
@@ -451,57 +988,46 @@ class ProviderSessionPreparationSystem:
         }
         
         if mood_entries:
-            # Day of week patterns
-            day_patterns = defaultdict(list)
-            for entry in mood_entries:
-                day = entry.timestamp.strftime('%A')
-                day_patterns[day].append(entry.intensity_level)
-            
-            patterns['day_patterns'] = {day: np.mean(levels) for day, levels in day_patterns.items()}
-            
-            # Time patterns
-            time_patterns = defaultdict(list)
-            for entry in mood_entries:
-                hour = entry.timestamp.hour
-                if hour < 12:
-                    time_slot = 'morning'
-                elif hour < 17:
-                    time_slot = 'afternoon'
-                else:
-                    time_slot = 'evening'
-                time_patterns[time_slot].append(entry.intensity_level)
-            
-            patterns['time_patterns'] = {time: np.mean(levels) for time, levels in time_patterns.items()}
-            
-            # Context patterns
-            context_patterns = defaultdict(list)
-            for entry in mood_entries:
+            # Day-of-week, time-of-day and social-context patterns share one
+            # pass; buckets hold [sum, count] in first-seen order
+            day_totals = {}
+            time_totals = {}
+            context_totals = {}
+            for entry, level in zip(mood_entries, mood_levels.tolist()):
+                buckets = [(day_totals, WEEKDAY_NAMES[int(entry.dow)]), (time_totals, entry.time_slot)]
                 if entry.social_context:
-                    context_patterns[entry.social_context].append(entry.intensity_level)
+                    buckets.append((context_totals, entry.social_context))
+                for totals, key in buckets:
+                    bucket = totals.setdefault(key, [0, 0])
+                    bucket[0] += level
+                    bucket[1] += 1
             
-            patterns['context_patterns'] = {context: np.mean(levels) for context, levels in context_patterns.items()}
+            patterns['day_patterns'] = _bucket_means(day_totals)
+            patterns['time_patterns'] = _bucket_means(time_totals)
+            patterns['context_patterns'] = _bucket_means(context_totals)
             
             # Trend analysis
-            if len(mood_entries) >= 3:
-                recent_avg = np.mean([entry.intensity_level for entry in mood_entries[-3:]])
-                earlier_avg = np.mean([entry.intensity_level for entry in mood_entries[:3]])
-                if recent_avg > earlier_avg + 1:
-                    patterns['trend'] = 'improving'
-                elif recent_avg < earlier_avg - 1:
-                    patterns['trend'] = 'declining'
+            patterns['trend'] = _classify_trend(_mood_trend_averages(mood_levels))
         
         return patterns
     
-    def _analyze_exercise_patterns_for_talking_points(self, patient_id: int) -> Dict[str, Any]:
-        """Analyze exercise patterns for talking points"""
-        week_ago = datetime.now() - timedelta(days=7)
-        
-        exercise_sessions = ExerciseSession.query.filter(
-            and_(
-                ExerciseSession.patient_id == patient_id,
-                ExerciseSession.start_time >= week_ago
-            )
-        ).all()
+    def _analyze_exercise_patterns_for_talking_points(self, patient_id: int, week_ago: datetime,
+                                                      exercise_sessions: Optional[List] = None) -> Dict[str, Any]:
+        """Analyze exercise patterns for talking points
+        
+        exercise_sessions may be passed preloaded (rows with completion_status,
+        effectiveness_rating and type); otherwise they are queried.
+        """
+        if exercise_sessions is None:
+            # Sessions as (completion_status, effectiveness_rating, exercise_type) rows
+            exercise_sessions = ExerciseSession.query.with_entities(
+                ExerciseSession.completion_status, ExerciseSession.effectiveness_rating, Exercise.type
+            ).outerjoin(Exercise, ExerciseSession.exercise_id == Exercise.id).filter(
+                and_(
+                    ExerciseSession.patient_id == patient_id,
+                    ExerciseSession.start_time >= week_ago
+                )
+            ).all()
         
         patterns = {
             'completion_rate': 0,
@@ -511,7 +1037,7 @@ class ProviderSessionPreparationSystem:
         }
         
         if exercise_sessions:
-            completed = [s for s in exercise_sessions if s.completion_status == 'completed']
+            completed, abandoned = _partition_exercises(exercise_sessions)
             patterns['completion_rate'] = len(completed) / len(exercise_sessions)
             
             # Analyze effectiveness
@@ -520,31 +1046,34 @@ class ProviderSessionPreparationSystem:
                 patterns['effectiveness'] = np.mean([s.effectiveness_rating for s in rated_sessions])
             
             # Analyze preferred types
-            type_counts = defaultdict(int)
-            for session in completed:
-                if session.exercise and session.exercise.type:
-                    type_counts[session.exercise.type] += 1
+            type_counts = Counter(filter(None, map(_exercise_type, completed)))
             
             if type_counts:
-                patterns['preferred_types'] = [t for t, c in sorted(type_counts.items(), key=lambda x: x[1], reverse=True)]
+                patterns['preferred_types'] = [t for t, _ in type_counts.most_common()]
             
             # Identify barriers
-            abandoned = [s for s in exercise_sessions if s.completion_status == 'abandoned']
             if abandoned:
                 patterns['barriers'].append(f"{len(abandoned)} exercises were started but not completed")
         
         return patterns
     
-    def _analyze_cbt_patterns_for_talking_points(self, patient_id: int) -> Dict[str, Any]:
-        """Analyze CBT patterns for talking points"""
-        month_ago = datetime.now() - timedelta(days=30)
-        
-        thought_records = ThoughtRecord.query.filter(
-            and_(
-                ThoughtRecord.patient_id == patient_id,
-                ThoughtRecord.created_at >= month_ago
-            )
-        ).all()
+    def _analyze_cbt_patterns_for_talking_points(self, patient_id: int, month_ago: datetime,
+                                                 thought_records: Optional[List] = None) -> Dict[str, Any]:
+        """Analyze CBT patterns for talking points (thought_records may be passed preloaded)
+        
+        ThoughtRecord stores no distortion type or insight score, so distortion_types,
+        insight_development and skill_mastery keep their defaults; only the amount of
+        practice is assessed.
+        """
+        if thought_records is None:
+            record_count = db.session.query(func.count(ThoughtRecord.id)).filter(
+                and_(
+                    ThoughtRecord.patient_id == patient_id,
+                    ThoughtRecord.created_at >= month_ago
+                )
+            ).scalar()
+        else:
+            record_count = len(thought_records)
         
         patterns = {
             'distortion_types': [],
@@ -553,77 +1082,52 @@ class ProviderSessionPreparationSystem:
             'challenges': []
         }
         
-        if thought_records:
-            # Analyze distortion types
-            distortion_counts = defaultdict(int)
-            for record in thought_records:
-                if record.cognitive_distortion:
-                    distortion_counts[record.cognitive_distortion] += 1
-            
-            patterns['distortion_types'] = [d for d, c in sorted(distortion_counts.items(), key=lambda x: x[1], reverse=True)]
-            
-            # Analyze insight development
-            insight_scores = [r.insight_score for r in thought_records if r.insight_score]
-            if insight_scores:
-                patterns['insight_development'] = np.mean(insight_scores)
-                
-                if patterns['insight_development'] >= 8:
-                    patterns['skill_mastery'] = 'advanced'
-                elif patterns['insight_development'] >= 6:
-                    patterns['skill_mastery'] = 'intermediate'
-            
-            # Identify challenges
-            if len(thought_records) < 5:
-                patterns['challenges'].append("Limited thought record practice")
-            
-            if patterns['insight_development'] and patterns['insight_development'] < 5:
-                patterns['challenges'].append("Difficulty developing cognitive insight")
+        # Identify challenges
+        if record_count and record_count < 5:
+            patterns['challenges'].append("Limited thought record practice")
         
         return patterns
     
-    def _analyze_crisis_patterns_for_talking_points(self, patient_id: int) -> Dict[str, Any]:
-        """Analyze crisis patterns for talking points"""
-        month_ago = datetime.now() - timedelta(days=30)
-        
-        crisis_alerts = CrisisAlert.query.filter(
-            and_(
-                CrisisAlert.patient_id == patient_id,
-                CrisisAlert.created_at >= month_ago
-            )
-        ).all()
+    def _analyze_crisis_patterns_for_talking_points(self, patient_id: int, month_ago: datetime,
+                                                    crisis_hours: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Analyze crisis patterns for talking points (crisis_hours may be passed preloaded)"""
+        if crisis_hours is None:
+            crisis_hours = self._get_crisis_hour_counts(patient_id, month_ago)
+        time_patterns = _time_of_day_counts(crisis_hours)
+        crisis_count = int(crisis_hours.sum())
         
         patterns = {
-            'frequency': len(crisis_alerts),
+            'frequency': crisis_count,
             'triggers': [],
             'timing': {},
             'intervention_effectiveness': 'unknown'
         }
         
-        if crisis_alerts:
+        if crisis_count:
             # Analyze timing patterns
-            time_patterns = defaultdict(int)
-            for alert in crisis_alerts:
-                hour = alert.created_at.hour
-                if hour < 12:
-                    time_slot = 'morning'
-                elif hour < 17:
-                    time_slot = 'afternoon'
-                else:
-                    time_slot = 'evening'
-                time_patterns[time_slot] += 1
-            
-            patterns['timing'] = dict(time_patterns)
+            patterns['timing'] = time_patterns
             
             # Check intervention effectiveness
-            if len(crisis_alerts) == 0:
-                patterns['intervention_effectiveness'] = 'good'
-            elif len(crisis_alerts) <= 2:
+            if crisis_count <= 2:
                 patterns['intervention_effectiveness'] = 'moderate'
             else:
                 patterns['intervention_effectiveness'] = 'poor'
         
         return patterns
     
+    def _get_crisis_hour_counts(self, patient_id: int, month_ago: datetime) -> np.ndarray:
+        """Crisis alerts per hour of day (24 buckets), counted by the database"""
+        crisis_hour = extract('hour', CrisisAlert.created_at)
+        hour_counts = np.zeros(24, dtype=np.int64)
+        for hour, count in db.session.query(crisis_hour, func.count(CrisisAlert.id)).filter(
+            and_(
+                CrisisAlert.patient_id == patient_id,
+                CrisisAlert.created_at >= month_ago
+            )
+        ).group_by(crisis_hour):
+            hour_counts[int(hour)] = count
+        return hour_counts
+    
     def _generate_talking_points(self, patient_id: int, mood_patterns: Dict, 
                                exercise_patterns: Dict, cbt_patterns: Dict, 
                                crisis_patterns: Dict) -> Dict[str, Any]:
@@ -687,64 +1191,62 @@ class ProviderSessionPreparationSystem:
         
         return talking_points
     
-    def _get_correlation_data(self, patient_id: int) -> Dict[str, Any]:
-        """Get correlation data between activities and outcomes"""
-        month_ago = datetime.now() - timedelta(days=30)
-        
-        # Get mood and exercise data
-        mood_entries = MoodEntry.query.filter(
-            and_(
-                MoodEntry.patient_id == patient_id,
-                MoodEntry.timestamp >= month_ago
-            )
-        ).order_by(MoodEntry.timestamp).all()
-        
-        exercise_sessions = ExerciseSession.query.filter(
-            and_(
-                ExerciseSession.patient_id == patient_id,
-                ExerciseSession.start_time >= month_ago,
-                ExerciseSession.completion_status == 'completed'
-            )
-        ).order_by(ExerciseSession.start_time).all()
-        
+    def _get_correlation_data(self, patient_id: int, month_ago: datetime,
+                              daily_mood: Optional[Dict] = None,
+                              daily_exercise: Optional[Dict] = None) -> Dict[str, Any]:
+        """Get correlation data between activities and outcomes
+        
+        daily_mood ({day: mean intensity}) and daily_exercise ({day: completed
+        sessions}) may be passed precomputed; otherwise the database groups them.
+        """
         correlations = {
             'mood_exercise_correlation': None,
             'exercise_effectiveness_correlation': None,
             'timing_effectiveness': None
         }
         
+        if daily_mood is None:
+            mood_day = func.date(MoodEntry.timestamp).label('day')
+            daily_mood = dict(db.session.query(mood_day, func.avg(MoodEntry.intensity_level)).filter(
+                and_(
+                    MoodEntry.patient_id == patient_id,
+                    MoodEntry.timestamp >= month_ago
+                )
+            ).group_by(mood_day).all())
+        if daily_exercise is None:
+            session_day = func.date(ExerciseSession.start_time).label('day')
+            daily_exercise = dict(db.session.query(session_day, func.count(ExerciseSession.id)).filter(
+                and_(
+                    ExerciseSession.patient_id == patient_id,
+                    ExerciseSession.start_time >= month_ago,
+                    ExerciseSession.completion_status == 'completed'
+                )
+            ).group_by(session_day).all())
+        
         # Calculate mood-exercise correlation
-        if mood_entries and exercise_sessions:
-            # Create daily mood averages
-            daily_mood = defaultdict(list)
-            for entry in mood_entries:
-                date = entry.timestamp.date()
-                daily_mood[date].append(entry.intensity_level)
-            
-            daily_mood_avg = {date: np.mean(levels) for date, levels in daily_mood.items()}
-            
-            # Create daily exercise counts
-            daily_exercise = defaultdict(int)
-            for session in exercise_sessions:
-                date = session.start_time.date()
-                daily_exercise[date] += 1
-            
+        if daily_mood and daily_exercise:
             # Calculate correlation
-            common_dates = set(daily_mood_avg.keys()) & set(daily_exercise.keys())
+            common_dates = sorted(daily_mood.keys() & daily_exercise.keys())
             if len(common_dates) >= 5:
-                mood_values = [daily_mood_avg[date] for date in common_dates]
-                exercise_values = [daily_exercise[date] for date in common_dates]
+                mood_values = np.fromiter(map(daily_mood.__getitem__, common_dates),
+                                          dtype=np.float64, count=len(common_dates))
+                exercise_values = np.fromiter(map(daily_exercise.__getitem__, common_dates),
+                                              dtype=np.float64, count=len(common_dates))
                 
-                correlation = np.corrcoef(mood_values, exercise_values)[0, 1]
+                correlation = _pearson(mood_values, exercise_values)
                 if not np.isnan(correlation):
                     correlations['mood_exercise_correlation'] = round(correlation, 3)
         
         return correlations
     
-    def _get_pattern_recognition(self, patient_id: int) -> Dict[str, Any]:
-        """Get pattern recognition insights"""
-        month_ago = datetime.now() - timedelta(days=30)
-        
+    def _get_pattern_recognition(self, patient_id: int, month_ago: datetime,
+                                 crisis_hours: Optional[np.ndarray] = None,
+                                 avg_effectiveness: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Get pattern recognition insights
+        
+        crisis_hours (24 hourly counts) and avg_effectiveness ({time slot: mean
+        rating}) may be passed preloaded; otherwise they are queried.
+        """
         patterns = {
             'crisis_triggers': [],
             'optimal_timing': [],
@@ -752,61 +1254,50 @@ class ProviderSessionPreparationSystem:
             'success_patterns': []
         }
         
-        # Analyze crisis triggers
-        crisis_alerts = CrisisAlert.query.filter(
-            and_(
-                CrisisAlert.patient_id == patient_id,
-                CrisisAlert.created_at >= month_ago
-            )
-        ).all()
-        
-        if crisis_alerts:
-            # Look for timing patterns
-            crisis_times = [alert.created_at.hour for alert in crisis_alerts]
-            if crisis_times:
-                most_common_hour = max(set(crisis_times), key=crisis_times.count)
-                patterns['crisis_triggers'].append(f"Crisis episodes most common around {most_common_hour}:00")
-        
-        # Analyze optimal timing
-        exercise_sessions = ExerciseSession.query.filter(
-            and_(
-                ExerciseSession.patient_id == patient_id,
-                ExerciseSession.start_time >= month_ago,
-                ExerciseSession.completion_status == 'completed',
-                ExerciseSession.effectiveness_rating.isnot(None)
-            )
-        ).all()
-        
-        if exercise_sessions:
+        # Analyze crisis triggers: most common hour (argmax keeps the earliest on ties)
+        if crisis_hours is None:
+            crisis_hours = self._get_crisis_hour_counts(patient_id, month_ago)
+        
+        if crisis_hours.any():
+            most_common_hour = int(crisis_hours.argmax())
+            patterns['crisis_triggers'].append(f"Crisis episodes most common around {most_common_hour}:00")
+        
+        # Analyze optimal timing: average effectiveness per time of day
+        if avg_effectiveness is None:
+            time_slot = _time_of_day(ExerciseSession.start_time)
+            avg_effectiveness = dict(db.session.query(time_slot, func.avg(ExerciseSession.effectiveness_rating)).filter(
+                and_(
+                    ExerciseSession.patient_id == patient_id,
+                    ExerciseSession.start_time >= month_ago,
+                    ExerciseSession.completion_status == 'completed',
+                    ExerciseSession.effectiveness_rating.isnot(None)
+                )
+            ).group_by(time_slot).all())
+        
+        if avg_effectiveness:
             # Find most effective time
-            time_effectiveness = defaultdict(list)
-            for session in exercise_sessions:
-                hour = session.start_time.hour
-                if hour < 12:
-                    time_slot = 'morning'
-                elif hour < 17:
-                    time_slot = 'afternoon'
-                else:
-                    time_slot = 'evening'
-                time_effectiveness[time_slot].append(session.effectiveness_rating)
-            
-            if time_effectiveness:
-                avg_effectiveness = {time: np.mean(ratings) for time, ratings in time_effectiveness.items()}
-                best_time = max(avg_effectiveness.items(), key=lambda x: x[1])
-                patterns['optimal_timing'].append(f"Exercises most effective in {best_time[0]} ({best_time[1]:.1f}/10)")
+            best_time = max(avg_effectiveness.items(), key=lambda x: x[1])
+            patterns['optimal_timing'].append(f"Exercises most effective in {best_time[0]} ({best_time[1]:.1f}/10)")
         
         return patterns
     
-    def _get_skill_development_metrics(self, patient_id: int) -> Dict[str, Any]:
-        """Get skill development metrics"""
-        month_ago = datetime.now() - timedelta(days=30)
-        
-        thought_records = ThoughtRecord.query.filter(
-            and_(
-                ThoughtRecord.patient_id == patient_id,
-                ThoughtRecord.created_at >= month_ago
-            )
-        ).order_by(ThoughtRecord.created_at).all()
+    def _get_skill_development_metrics(self, patient_id: int, month_ago: datetime,
+                                       thought_records: Optional[List] = None) -> Dict[str, Any]:
+        """Get skill development metrics (thought_records may be passed preloaded)
+        
+        ThoughtRecord stores no insight score, so cbt_mastery and insight_development
+        stay 0 and readiness_for_advancement stays False; skill_consistency comes from
+        the number of records.
+        """
+        if thought_records is None:
+            record_count = db.session.query(func.count(ThoughtRecord.id)).filter(
+                and_(
+                    ThoughtRecord.patient_id == patient_id,
+                    ThoughtRecord.created_at >= month_ago
+                )
+            ).scalar()
+        else:
+            record_count = len(thought_records)
         
         metrics = {
             'cbt_mastery': 0,
@@ -815,34 +1306,39 @@ class ProviderSessionPreparationSystem:
             'readiness_for_advancement': False
         }
         
-        if thought_records:
-            # Calculate CBT mastery
-            insight_scores = [r.insight_score for r in thought_records if r.insight_score]
-            if insight_scores:
-                metrics['cbt_mastery'] = round(np.mean(insight_scores) * 10, 1)  # Convert to percentage
-                metrics['insight_development'] = round(np.mean(insight_scores) * 10, 1)
-            
-            # Calculate skill consistency
-            if len(thought_records) >= 5:
-                metrics['skill_consistency'] = min(100, len(thought_records) * 10)
-            
-            # Determine readiness for advancement
-            if metrics['cbt_mastery'] >= 70 and metrics['skill_consistency'] >= 50:
-                metrics['readiness_for_advancement'] = True
+        # Calculate skill consistency
+        if record_count >= 5:
+            metrics['skill_consistency'] = min(100, record_count * 10)
         
         return metrics
     
-    def _get_treatment_response_data(self, patient_id: int) -> Dict[str, Any]:
-        """Get treatment response data"""
-        month_ago = datetime.now() - timedelta(days=30)
-        
-        exercise_sessions = ExerciseSession.query.filter(
-            and_(
-                ExerciseSession.patient_id == patient_id,
-                ExerciseSession.start_time >= month_ago,
-                ExerciseSession.effectiveness_rating.isnot(None)
-            )
-        ).all()
+    def _get_treatment_response_data(self, patient_id: int, month_ago: datetime,
+                                     type_stats: Optional[List] = None,
+                                     rating_ends: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """Get treatment response data
+        
+        type_stats ((type, rating sum, rating count, first id) per exercise type)
+        and rating_ends (mean of the 'earlier' and 'recent' three ratings) may be
+        passed preloaded; otherwise they are queried.
+        """
+        rated = and_(
+            ExerciseSession.patient_id == patient_id,
+            ExerciseSession.start_time >= month_ago,
+            ExerciseSession.effectiveness_rating.isnot(None)
+        )
+        
+        if type_stats is None:
+            # Rating sum and count per exercise type, aggregated by the database;
+            # MIN(id) keeps the first-recorded order for ranking ties
+            type_stats = db.session.query(
+                Exercise.type,
+                func.sum(ExerciseSession.effectiveness_rating),
+                func.count(ExerciseSession.effectiveness_rating),
+                func.min(ExerciseSession.id)
+            ).select_from(ExerciseSession).outerjoin(
+                Exercise, ExerciseSession.exercise_id == Exercise.id
+            ).filter(rated).group_by(Exercise.type).all()
+        session_count = sum(count for _, _, count, _ in type_stats)
         
         response_data = {
             'overall_effectiveness': None,
@@ -851,30 +1347,32 @@ class ProviderSessionPreparationSystem:
             'areas_for_improvement': []
         }
         
-        if exercise_sessions:
+        if session_count:
             # Calculate overall effectiveness
-            effectiveness_scores = [s.effectiveness_rating for s in exercise_sessions]
-            response_data['overall_effectiveness'] = round(np.mean(effectiveness_scores), 2)
+            rating_total = sum(total for _, total, _, _ in type_stats)
+            response_data['overall_effectiveness'] = round(np.float64(rating_total) / session_count, 2)
             
-            # Determine trend
-            if len(exercise_sessions) >= 6:
-                recent_avg = np.mean([s.effectiveness_rating for s in exercise_sessions[-3:]])
-                earlier_avg = np.mean([s.effectiveness_rating for s in exercise_sessions[:3]])
+            # Determine trend from the first and last three rated sessions
+            if session_count >= 6:
+                if rating_ends is None:
+                    ranked = _ranked_ratings(rated)
+                    earlier_avg, recent_avg = db.session.query(
+                        func.avg(case((ranked.c.from_first <= 3, ranked.c.rating))),
+                        func.avg(case((ranked.c.from_last <= 3, ranked.c.rating)))
+                    ).one()
+                else:
+                    earlier_avg, recent_avg = rating_ends['earlier'], rating_ends['recent']
                 if recent_avg > earlier_avg + 1:
                     response_data['effectiveness_trend'] = 'improving'
                 elif recent_avg < earlier_avg - 1:
                     response_data['effectiveness_trend'] = 'declining'
             
             # Identify best interventions
-            type_effectiveness = defaultdict(list)
-            for session in exercise_sessions:
-                if session.exercise and session.exercise.type:
-                    type_effectiveness[session.exercise.type].append(session.effectiveness_rating)
-            
-            if type_effectiveness:
-                avg_by_type = {t: np.mean(ratings) for t, ratings in type_effectiveness.items()}
-                best_types = sorted(avg_by_type.items(), key=lambda x: x[1], reverse=True)
-                response_data['best_interventions'] = [t[0] for t in best_types[:3]]
+            best_types = sorted(
+                ((t, np.float64(total) / count, first_id) for t, total, count, first_id in type_stats if t),
+                key=lambda x: (-x[1], x[2])
+            )
+            response_data['best_interventions'] = [t[0] for t in best_types[:3]]
             
             # Identify areas for improvement
             if response_data['overall_effectiveness'] and response_data['overall_effectiveness'] < 6:
@@ -916,6 +1414,9 @@ class ProviderSessionPreparationSystem:
         
         return insights
 
+# Initialize the session preparation system (stateless, shared by every request)
+session_preparation_system = ProviderSessionPreparationSystem()
+
 # API Routes
 @session_preparation.route('/api/pre-session-brief/<int:patient_id>')
 @login_required
@@ -924,10 +1425,33 @@ def get_pre_session_brief(patient_id):
     if current_user.role != 'provider':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    system = ProviderSessionPreparationSystem()
-    brief = system.generate_pre_session_brief(patient_id)
+    brief = session_preparation_system.generate_pre_session_brief(patient_id)
     return jsonify(brief)
 
+@session_preparation.route('/api/pre-session-briefs')
+@login_required
+def get_pre_session_briefs():
+    """Get pre-session briefs for several patients (?patient_id=1&patient_id=2)"""
+    if current_user.role != 'provider':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    patient_ids = request.args.getlist('patient_id', type=int)
+    if not patient_ids:
+        return jsonify({'error': 'No patient_id provided'}), 400
+    
+    briefs = session_preparation_system.generate_pre_session_briefs(patient_ids)
+    return jsonify({'briefs': {str(pid): brief for pid, brief in briefs.items()}})
+
+@session_preparation.route('/api/session-package/<int:patient_id>')
+@login_required
+def get_session_package(patient_id):
+    """Get the pre-session brief, talking points and session plan in one response"""
+    if current_user.role != 'provider':
+        return jsonify({'error': 'Unauthorized'}), 403
+    
+    package = session_preparation_system.generate_session_package(patient_id)
+    return jsonify(package)
+
 @session_preparation.route('/api/session-talking-points/<int:patient_id>')
 @login_required
 def get_session_talking_points(patient_id):
@@ -935,8 +1459,7 @@ def get_session_talking_points(patient_id):
     if current_user.role != 'provider':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    system = ProviderSessionPreparationSystem()
-    talking_points = system.generate_session_talking_points(patient_id)
+    talking_points = session_preparation_system.generate_session_talking_points(patient_id)
     return jsonify(talking_points)
 
 @session_preparation.route('/api/evidence-based-session-plan/<int:patient_id>')
@@ -946,6 +1469,5 @@ def get_evidence_based_session_plan(patient_id):
     if current_user.role != 'provider':
         return jsonify({'error': 'Unauthorized'}), 403
     
-    system = ProviderSessionPreparationSystem()
-    session_plan = system.generate_evidence_based_session_plan(patient_id)
+    session_plan = session_preparation_system.generate_evidence_based_session_plan(patient_id)
     return jsonify(session_plan)
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Tests for the provider exercise feedback service and routes
+"""
+
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import provider_exercise_feedback_system
+import provider_feedback_routes
+from provider_exercise_feedback_system import provider_exercise_feedback
+from app_ml_complete import ProviderExerciseFeedback, User
+
+ANALYTICS_URL = '/provider/api/feedback_analytics'
+
+@pytest.fixture
+def frozen_etag_window(monkeypatch):
+    """Keep the ETag's time window fixed so a test can't straddle a window boundary"""
+    monkeypatch.setattr(provider_feedback_routes, 'time', SimpleNamespace(time=lambda: 1_700_000_000.0))
+
+def test_etag_round_trip(client, provider, make_patient, make_feedback, frozen_etag_window):
+    """A matching If-None-Match gets 304 until the provider submits new feedback"""
+    patient = make_patient()
+    make_feedback(patient, provider)
+
+    first = client.get(ANALYTICS_URL)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    unchanged = client.get(ANALYTICS_URL, headers={'If-None-Match': etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers['ETag'] == etag
+    assert not unchanged.data
+
+    # Compressed responses echo the tag back with an encoding suffix
+    compressed = client.get(ANALYTICS_URL, headers={'If-None-Match': f'"{etag.strip(chr(34))}:gzip"'})
+    assert compressed.status_code == 304
+
+    make_feedback(patient, provider, action='reject')
+
+    changed = client.get(ANALYTICS_URL, headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+
+def test_etag_is_per_provider(db_session, client, login_as, provider, make_patient, make_feedback,
+                              frozen_etag_window):
+    """Another provider's tag never matches, and non-providers are refused before the ETag check"""
+    patient = make_patient()
+    make_feedback(patient, provider)
+    etag = client.get(ANALYTICS_URL).headers['ETag']
+
+    other_provider = User(username=f'provider_{uuid.uuid4().hex}', email=f'{uuid.uuid4().hex}@example.com',
+                          password_hash='x', role='provider')
+    db_session.add(other_provider)
+    db_session.flush()
+    other = login_as(other_provider).get(ANALYTICS_URL, headers={'If-None-Match': etag})
+    assert other.status_code == 200
+    assert other.headers['ETag'] != etag
+
+    patient_user = db_session.get(User, patient.user_id)
+    assert login_as(patient_user).get(ANALYTICS_URL, headers={'If-None-Match': etag}).status_code == 403
+
+def test_available_exercises_are_copies_of_the_cache(db_session, make_patient, monkeypatch):
+    """Changing a returned catalog leaves the cached one intact"""
+    make_patient()
+    monkeypatch.setattr(provider_exercise_feedback, '_available_exercises', None)
+    exercises = provider_exercise_feedback._get_available_exercises()
+    expected = [dict(exercise) for exercise in exercises]
+
+    exercises[0]['name'] = 'changed'
+    exercises.clear()
+
+    assert provider_exercise_feedback._get_available_exercises() == expected
+
+def test_bulk_feedback_isolates_failing_items(db_session, provider, make_patient, monkeypatch):
+    """A failing item is rolled back on its own; the rest are written and reported per item"""
+    patient = make_patient()
+    apply_action = provider_exercise_feedback._apply_feedback_action
+
+    def failing_action(patient_id, feedback_data, created_at):
+        if feedback_data['exercise_type'] == 'failing':
+            raise RuntimeError('side effect failed')
+        return apply_action(patient_id, feedback_data, created_at)
+
+    monkeypatch.setattr(provider_exercise_feedback, '_apply_feedback_action', failing_action)
+
+    items = [
+        {'action': 'reject', 'exercise_type': 'mindfulness', 'category': 'effectiveness'},
+        {'action': 'not_an_action', 'exercise_type': 'cbt'},
+        {'action': 'reject', 'exercise_type': 'failing'},
+        {'action': 'reject', 'exercise_type': 'breathing'}
+    ]
+    result = provider_exercise_feedback.submit_provider_feedback_bulk(patient.id, provider.id, items)
+
+    assert result['success'] is True
+    assert result['submitted_count'] == 2
+    assert [('feedback_id' in item) for item in result['results']] == [True, False, False, True]
+    assert result['results'][1] == {'error': 'Invalid feedback data'}
+    assert 'side effect failed' in result['results'][2]['error']
+
+    stored = ProviderExerciseFeedback.query.filter(ProviderExerciseFeedback.id.in_(result['feedback_ids'])).all()
+    assert sorted(record.exercise_type for record in stored) == ['breathing', 'mindfulness']
+    assert ProviderExerciseFeedback.query.filter_by(patient_id=patient.id, exercise_type='failing').count() == 0
+
+def test_bulk_feedback_single_insert_keeps_input_order(db_session, provider, make_patient):
+    """Ids from the single INSERT ... RETURNING line up with the submitted items"""
+    patient = make_patient()
+    items = [{'action': 'reject', 'exercise_type': f'exercise_{index}'} for index in range(5)]
+
+    result = provider_exercise_feedback.submit_provider_feedback_bulk(patient.id, provider.id, items)
+
+    assert result['submitted_count'] == 5
+    for item, outcome in zip(items, result['results']):
+        record = db_session.get(ProviderExerciseFeedback, outcome['feedback_id'])
+        assert record.exercise_type == item['exercise_type']
+
+def test_bulk_feedback_all_invalid(db_session, provider, make_patient):
+    """A batch with no valid item is rejected with the offending indices"""
+    patient = make_patient()
+
+    result = provider_exercise_feedback.submit_provider_feedback_bulk(
+        patient.id, provider.id, [{'action': 'nope'}, {'exercise_type': 'cbt'}]
+    )
+
+    assert result == {'error': 'Invalid feedback data', 'invalid_indices': [0, 1]}
+
+def test_bulk_feedback_route_submits_recommended_exercises(db_session, client, make_patient):
+    """The route writes one feedback row per daily and weekly recommendation"""
+    patient = make_patient()
+
+    response = client.post('/provider/api/bulk_feedback', json={'patient_id': patient.id, 'action': 'approve'})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['processed_count'] > 0
+    assert body['processed_count'] == len(body['results'])
+    stored = ProviderExerciseFeedback.query.filter_by(patient_id=patient.id).all()
+    assert sorted(record.id for record in stored) == sorted(result['feedback_id'] for result in body['results'])
+
+def test_bulk_feedback_route_rejects_invalid_action(db_session, client, make_patient):
+    """An unknown action is a 400 and nothing is written"""
+    patient = make_patient()
+
+    response = client.post('/provider/api/bulk_feedback', json={'patient_id': patient.id, 'action': 'approve_all'})
+
+    assert response.status_code == 400
+    assert ProviderExerciseFeedback.query.filter_by(patient_id=patient.id).count() == 0
+
+def test_training_csv_export_streams_every_sample(client, provider, make_patient, make_feedback):
+    """The CSV export has the header plus one row per feedback record"""
+    patient = make_patient()
+    records = [make_feedback(patient, provider, exercise_type=exercise_type)
+               for exercise_type in ('cbt', 'mindfulness', 'breathing')]
+
+    response = client.get('/provider/api/export_rl_training_data')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    rows = list(csv.reader(io.StringIO(response.get_data(as_text=True))))
+    assert rows[0][:5] == ['patient_id', 'provider_id', 'timestamp', 'exercise_type', 'action']
+    assert len(rows) == len(records) + 1
+
+    by_type = {row[3]: dict(zip(rows[0], row)) for row in rows[1:]}
+    assert set(by_type) == {'cbt', 'mindfulness', 'breathing'}
+    for record in records:
+        row = by_type[record.exercise_type]
+        assert row['patient_id'] == str(patient.id)
+        assert row['provider_id'] == str(provider.id)
+        assert datetime.fromisoformat(row['timestamp']) == record.submitted_at
+        assert row['action'] == 'approve'
+
+def test_training_csv_export_skips_training_summaries(client, provider, make_patient, make_feedback, monkeypatch):
+    """The CSV export reads samples from the feedback cursor without computing the JSON summaries"""
+    patient = make_patient()
+    make_feedback(patient, provider)
+
+    def unused(training_data):
+        raise AssertionError('CSV export computed a training summary')
+
+    monkeypatch.setattr(provider_exercise_feedback, '_calculate_data_quality_metrics', unused)
+    monkeypatch.setattr(provider_exercise_feedback, '_calculate_feature_importance', unused)
+
+    response = client.get('/provider/api/export_rl_training_data')
+
+    assert response.status_code == 200
+    assert len(list(csv.reader(io.StringIO(response.get_data(as_text=True))))) == 2
+
+def test_training_samples_do_not_depend_on_export_chunks(provider, make_patient, make_feedback, monkeypatch):
+    """History prefetched around each chunk gives the same samples as one chunk for the whole export"""
+    patients = [make_patient(index) for index in range(2)]
+    for day in range(0, 24, 3):
+        make_feedback(patients[day % 2], provider, submitted_at=datetime.now() - timedelta(days=day, hours=day))
+
+    def export(chunk_size):
+        monkeypatch.setattr(provider_exercise_feedback_system, 'RL_EXPORT_CHUNK_SIZE', chunk_size)
+        return list(provider_exercise_feedback.iter_rl_training_data(provider.id))
+
+    samples = export(1)
+    assert samples == export(1000)
+    assert all(len(sample['patient_context']['mood_trend']) == 7 for sample in samples)
+    assert any(sample['outcome_data']['exercise_completion'] for sample in samples)
+
+def test_training_ndjson_export_matches_json(client, provider, make_patient, make_feedback):
+    """?format=ndjson streams the same samples as the JSON response, one per line"""
+    patient = make_patient()
+    for exercise_type in ('cbt', 'mindfulness'):
+        make_feedback(patient, provider, exercise_type=exercise_type)
+
+    streamed = client.get('/provider/api/rl_training_data?format=ndjson')
+    assert streamed.status_code == 200
+    assert streamed.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in streamed.get_data(as_text=True).splitlines()]
+
+    full = client.get('/provider/api/rl_training_data').get_json()
+    assert full['total_samples'] == len(lines) == 2
+    assert lines == full['training_data']
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the provider session preparation system
+"""
+
+import json
+
+import pytest
+
+from provider_session_preparation import ProviderSessionPreparationSystem, cache
+
+def _comparable(section):
+    """JSON-normalised section without its generation timestamp"""
+    section = json.loads(json.dumps(section, default=str))
+    section.pop('generated_at', None)
+    return section
+
+def test_session_package_matches_individual_generators(db_session, make_patient):
+    """The fused package returns exactly what the three generators return on their own"""
+    system = ProviderSessionPreparationSystem()
+
+    for index in range(3):
+        patient = make_patient(index)
+
+        separate = {
+            'pre_session_brief': system.generate_pre_session_brief(patient.id),
+            'session_talking_points': system.generate_session_talking_points(patient.id),
+            'evidence_based_session_plan': system.generate_evidence_based_session_plan(patient.id)
+        }
+        cache.clear()
+        package = system.generate_session_package(patient.id)
+        cache.clear()
+
+        for section, expected in separate.items():
+            assert 'error' not in expected, expected
+            assert _comparable(package[section]) == _comparable(expected), section
+
+def test_session_package_reports_missing_patient(db_session):
+    """An unknown patient yields an error in the brief rather than an exception"""
+    package = ProviderSessionPreparationSystem().generate_session_package(987654321)
+
+    assert 'error' in package['pre_session_brief']
+
+def test_pre_session_briefs_endpoint_returns_each_patient(client, make_patient):
+    """/api/pre-session-briefs returns one brief per requested patient, keyed by id"""
+    patients = [make_patient(index) for index in range(3)]
+    missing_id = 987654321
+
+    query = '&'.join(f'patient_id={pid}' for pid in [p.id for p in patients] + [missing_id])
+    response = client.get(f'/session-preparation/api/pre-session-briefs?{query}')
+
+    assert response.status_code == 200
+    briefs = response.get_json()['briefs']
+    assert set(briefs) == {str(p.id) for p in patients} | {str(missing_id)}
+    assert briefs[str(missing_id)] == {'error': 'Patient not found'}
+
+    system = ProviderSessionPreparationSystem()
+    for patient in patients:
+        cache.clear()
+        single = system.generate_pre_session_brief(patient.id)
+        assert briefs[str(patient.id)]['patient_info']['name'] == f'Test Patient {patients.index(patient)}'
+        assert _comparable(briefs[str(patient.id)]) == _comparable(single)
+
+def test_pre_session_briefs_endpoint_requires_patient_ids(client):
+    """/api/pre-session-briefs rejects a request without patient ids"""
+    response = client.get('/session-preparation/api/pre-session-briefs')
+
+    assert response.status_code == 400
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, '-q']))